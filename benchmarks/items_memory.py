@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Measures the memory taken by a loaded site's items and pages.
+
+Generates a synthetic site with the given number of posts and loads it
+with a cold frontmatter index, then loads it again from the warm index
+under tracemalloc, reporting the memory held once loading finished and the
+peak. Tracing slows loading down a lot, so only the untraced cold load and
+a second, untraced warm load are timed.
+
+    $ python benchmarks/items_memory.py --posts 50000
+"""
+
+from argparse import ArgumentParser
+from datetime import date, timedelta
+from os import makedirs, path as op
+from random import Random
+from tempfile import TemporaryDirectory
+from time import time
+import gc
+import tracemalloc
+
+from peppermynt.core import Peppermynt
+
+
+_CONFIG = """archive_layout: archive.html
+tag_layout: tag.html
+posts_url: /<year>/<month>/<slug>/
+"""
+
+
+def generate(src, posts, tags):
+    random = Random(0)
+    names = ['tag-{0}'.format(i) for i in range(tags)]
+    day = date(2000, 1, 1)
+
+    makedirs(op.join(src, '_posts'))
+    makedirs(op.join(src, '_templates'))
+
+    with open(op.join(src, 'config.yml'), 'w') as f:
+        f.write(_CONFIG)
+
+    for template in ('archive.html', 'post.html', 'tag.html'):
+        with open(op.join(src, '_templates', template), 'w') as f:
+            f.write('{{ page }}\n')
+
+    for i in range(posts):
+        name = '{0}-post-{1}.md'.format((day + timedelta(hours = 6 * i)).isoformat(), i)
+
+        with open(op.join(src, '_posts', name), 'w') as f:
+            f.write('---\nlayout: post.html\ntitle: Post {0}\ntags: [{1}]\n---\n\n{2}\n'.format(
+                i, ', '.join(random.sample(names, 3)), 'Lorem ipsum dolor sit amet. ' * 40))
+
+
+def load(src, dest):
+    start = time()
+    site = Peppermynt(['gen', src, dest])
+    site.load()
+
+    return site, time() - start
+
+
+def main():
+    parser = ArgumentParser(description = 'Benchmarks the memory used by loaded items.')
+
+    parser.add_argument('--posts', default=50000, type=int,
+        help='The number of synthetic posts to generate.')
+    parser.add_argument('--tags', default=200, type=int,
+        help='The number of distinct tags, three of which are given to each post.')
+
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as directory:
+        src, dest = op.join(directory, 'src'), op.join(directory, 'dest')
+
+        generate(src, args.posts, args.tags)
+
+        print('posts:  {0}'.format(args.posts))
+
+        _, cold = load(src, dest)
+        _, warm = load(src, dest)
+
+        gc.collect()
+        tracemalloc.start()
+
+        site, _ = load(src, dest)
+        current, peak = tracemalloc.get_traced_memory()
+
+        tracemalloc.stop()
+
+        print('cold:   {0:.3f}s'.format(cold))
+        print('warm:   {0:.3f}s'.format(warm))
+        print('memory: {0:.1f}MB held ({1:.0f}B/post), {2:.1f}MB peak, {3} pages'.format(
+            current / 1024 ** 2, current / args.posts, peak / 1024 ** 2, len(site.content.pages)))
+
+
+if __name__ == '__main__':
+    main()
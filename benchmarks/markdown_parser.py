@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Times the in-process markdown parser against the pandoc-based tufte parser.
+
+Converts synthetic posts with each parser, and with the tufte parser in
+batches. That both mark up posts the same way is checked by
+tests/test_markdown_parser.py.
+
+Requires pandoc (2.17 or newer for batching) and pandoc-sidenote.
+
+    $ python benchmarks/markdown_parser.py --posts 200
+"""
+
+from argparse import ArgumentParser
+from random import Random
+from time import time
+import sys
+
+from peppermynt.parsers import markdown, tufte
+
+
+_WORDS = ('sidenote', 'margin', 'typography', 'column', 'figure', 'epigraph',
+    'pandoc', 'mathjax', 'static', 'site', 'generator', 'tufte', 'prose')
+
+def post(random, paragraphs):
+    blocks = []
+
+    for i in range(paragraphs):
+        words = ' '.join(random.choice(_WORDS) for _ in range(60))
+        blocks.append('# Section {0}\n\n{1}[^{0}] *with* "quotes" and $x^{0}$.\n\n[^{0}]: A note.'.format(i, words))
+
+    return '\n\n'.join(blocks)
+
+
+def main():
+    parser = ArgumentParser(description = 'Benchmarks the markdown parser against the tufte parser.')
+
+    parser.add_argument('--posts', default=100, type=int,
+        help='The number of synthetic posts to convert.')
+    parser.add_argument('--paragraphs', default=5, type=int,
+        help='The number of sections in each post.')
+
+    args = parser.parse_args()
+
+    random = Random(0)
+    posts = [post(random, args.paragraphs) for _ in range(args.posts)]
+    results = []
+
+    for name, parser_ in (
+        ('tufte', tufte.Parser()),
+        ('tufte batch', tufte.Parser({'batch': True, 'batch_size': 100})),
+        ('markdown', markdown.Parser())
+    ):
+        start = time()
+        parser_.parse_batch(posts)
+        results.append((name, time() - start))
+
+    print('posts:        {0}'.format(args.posts))
+
+    for name, seconds in results:
+        print('{0:<13} {1:.3f}s ({2:.2f}ms/post)'.format(name + ':', seconds, 1000 * seconds / args.posts))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
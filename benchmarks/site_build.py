@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Times the phases of building a synthetic site.
+
+Generates a site with the given numbers of posts, tags, containers, assets
+and template partials, then builds it three times: a full build into an
+empty destination with cold caches, a no-op rebuild, and a rebuild after
+editing one post. Each build runs serially in a fresh process, like a run of
+`peppermynt gen`, and reports its wall time, the time spent in each phase,
+the numbers of files written and left unchanged, and the process's peak
+resident memory. Phases are timed inclusively, so a
+feed's time includes parsing any of its entries that weren't parsed yet.
+
+With --stub-parser, posts are converted by a trivial paragraph splitter
+instead of pandoc, which leaves only the Python side of the build.
+
+    $ python benchmarks/site_build.py --posts 2000 --stub-parser > build.json
+"""
+
+from argparse import ArgumentParser
+from collections import defaultdict
+from datetime import date, timedelta
+from functools import wraps
+from html import escape
+from multiprocessing import get_context
+from os import chdir, makedirs, path as op
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import json
+import resource
+import sys
+import tempfile
+
+from peppermynt import core
+from peppermynt.base import Parser
+from peppermynt.core import Peppermynt
+from peppermynt.doit_cmd import DoitPeppermynt
+from peppermynt.parsers import tufte
+from peppermynt.processors import Reader
+from peppermynt.stats import stats
+
+
+_WORDS = ('sidenote', 'margin', 'typography', 'column', 'figure', 'epigraph',
+    'pandoc', 'mathjax', 'static', 'site', 'generator', 'tufte', 'prose')
+
+_LAYOUT = """<!DOCTYPE html>
+<html>
+<head><title>{{{{ site.title }}}}</title></head>
+<body>
+{0}
+{{% block content %}}{{% endblock %}}
+</body>
+</html>
+"""
+
+_TEMPLATES = {
+    'post.html': """{% extends 'layout.html' %}
+{% block content %}
+<h1>{{ item.title }}</h1>
+<p>{% for tag in item.tags %}<a href="{{ get_url(posts.tags[tag].url) }}">{{ tag }}</a> {% endfor %}</p>
+{{ item.content }}
+{% endblock %}
+""",
+    'archive.html': """{% extends 'layout.html' %}
+{% block content %}
+{% for month in archive.months|values %}{% for post in month %}
+<a href="{{ get_url(post.url) }}">{{ post.title }}</a>
+{% endfor %}{% endfor %}
+{% endblock %}
+""",
+    'tag.html': """{% extends 'layout.html' %}
+{% block content %}
+{% for archive in tag.archives|values %}{% for month in archive.months|values %}{% for post in month %}
+<a href="{{ get_url(post.url) }}">{{ post.title }}</a>
+{% endfor %}{% endfor %}{% endfor %}
+{% endblock %}
+""",
+}
+
+_FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+<title>{{ site.title }}</title>
+{% for post in posts %}
+<entry>
+<id>{{ get_url(post.url, true) }}</id>
+<title>{{ post.title|escape }}</title>
+<content type="html">{{ post.content|absolutize|escape }}</content>
+</entry>
+{% endfor %}
+</feed>
+"""
+
+PHASES = ('load', 'init_parse', 'parse', 'render', 'feeds', 'assets')
+
+
+def _text(random, paragraphs):
+    return '\n\n'.join(' '.join(random.choice(_WORDS) for _ in range(60)) for _ in range(paragraphs))
+
+
+def _write(path, content, mode = 'w'):
+    makedirs(op.dirname(path), exist_ok = True)
+
+    with open(path, mode) as f:
+        f.write(content)
+
+
+def generate(src, args):
+    random = Random(0)
+    names = ['tag-{0}'.format(i) for i in range(args.tags)]
+    day = date(2000, 1, 1)
+
+    config = ['title: Synthetic', 'domain: example.com', 'archive_layout: archive.html',
+        'tag_layout: tag.html', 'posts_url: /<year>/<month>/<slug>/', 'archives_url: /archives/',
+        'tags_url: /tags/']
+
+    if args.feed_entries:
+        config.append('feed_entries: {0}'.format(args.feed_entries))
+
+    config.append('containers:')
+
+    for i in range(args.containers):
+        config.append('  c{0}: {{url: "/c{0}/<slug>/", archive_layout: archive.html, archives_url: /c{0}/archives/}}'.format(i))
+
+    _write(op.join(src, 'config.yml'), '\n'.join(config) + '\n')
+
+    partials = ['_templates/partial-{0}.html'.format(i) for i in range(args.templates)]
+
+    for i, partial in enumerate(partials):
+        _write(op.join(src, partial), '<nav>{{{{ site.title }}}} {0}</nav>\n'.format(i))
+
+    _write(op.join(src, '_templates', 'layout.html'), _LAYOUT.format(
+        '\n'.join("{{% include '{0}' %}}".format(op.basename(partial)) for partial in partials)))
+
+    for name, template in _TEMPLATES.items():
+        _write(op.join(src, '_templates', name), template)
+
+    _write(op.join(src, 'feed.xml'), _FEED)
+
+    posts = []
+
+    for i in range(args.posts):
+        name = '{0}-post-{1}.md'.format((day + timedelta(hours = 6 * i)).isoformat(), i)
+        tags = random.sample(names, min(3, len(names)))
+
+        posts.append(op.join(src, '_posts', name))
+
+        _write(posts[-1], '---\nlayout: post.html\ntitle: Post {0}\ntags: [{1}]\n---\n\n{2}\n'.format(
+            i, ', '.join(tags), _text(random, args.paragraphs)))
+
+    for c in range(args.containers):
+        for i in range(args.container_items):
+            _write(op.join(src, '_containers', 'c{0}'.format(c), '{0}-item-{1}.md'.format(
+                (day + timedelta(days = i)).isoformat(), i)),
+                '---\nlayout: post.html\ntitle: Item {0}\n---\n\n{1}\n'.format(i, _text(random, args.paragraphs)))
+
+    for i in range(args.assets):
+        _write(op.join(src, '_assets', 'a{0}'.format(i % 16), 'asset-{0}.bin'.format(i)),
+            bytes(random.getrandbits(8) for _ in range(args.asset_size)), 'wb')
+
+    return posts
+
+
+class _StubParser(Parser):
+    def parse(self, markdown):
+        return ''.join('<p>{0}</p>\n'.format(escape(block.strip())) for block in markdown.split('\n\n') if block.strip())
+
+    def version(self):
+        return 'stub'
+
+
+def _timed(times, calls, phase, function):
+    @wraps(function)
+    def timed(*args, **kwargs):
+        start = perf_counter()
+
+        try:
+            return function(*args, **kwargs)
+        finally:
+            times[phase] += perf_counter() - start
+            calls[phase] += 1
+
+    return timed
+
+
+def _build(argv, stub, conn):
+    times, calls = defaultdict(float), defaultdict(int)
+
+    if stub:
+        for name in ('parse', 'parse_batch', 'version'):
+            setattr(tufte.Parser, name, getattr(_StubParser, name))
+
+    Peppermynt.load = _timed(times, calls, 'load', Peppermynt.load)
+    Reader.init_parse = _timed(times, calls, 'init_parse', Reader.init_parse)
+    Peppermynt.parse_items = _timed(times, calls, 'parse', Peppermynt.parse_items)
+    Peppermynt.render_page = _timed(times, calls, 'render', Peppermynt.render_page)
+    Peppermynt.render_feed = _timed(times, calls, 'feeds', Peppermynt.render_feed)
+    core.sync = _timed(times, calls, 'assets', core.sync)
+
+    # keep doit's report of the tasks it ran out of the JSON on stdout
+    sys.stdout = sys.stderr
+
+    start = perf_counter()
+    peppermynt = Peppermynt(argv)
+    code = DoitPeppermynt(peppermynt).run(peppermynt.doit_args)
+    wall = perf_counter() - start
+
+    conn.send({
+        'exit_code': code,
+        'wall': round(wall, 4),
+        'phases': {phase: {'seconds': round(times[phase], 4), 'calls': calls[phase]} for phase in PHASES},
+        'files': {name: stats.get(name) for name in stats.names},
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    })
+
+
+def build(directory, argv, stub):
+    """Runs one build in a forked process, so each starts as cold as a new `peppermynt gen`."""
+    context = get_context('fork')
+    parent, child = context.Pipe(False)
+
+    def run():
+        # doit keeps its state in the working directory and peppermynt its caches in the temp one
+        chdir(directory)
+        tempfile.tempdir = directory
+
+        _build(argv, stub, child)
+
+    process = context.Process(target = run)
+    process.start()
+    result = parent.recv()
+    process.join()
+
+    return result
+
+
+def main():
+    parser = ArgumentParser(description = 'Benchmarks the phases of full and incremental builds.')
+
+    parser.add_argument('--posts', default=1000, type=int,
+        help='The number of synthetic posts to generate.')
+    parser.add_argument('--paragraphs', default=5, type=int,
+        help='The number of paragraphs in each post and container item.')
+    parser.add_argument('--tags', default=50, type=int,
+        help='The number of distinct tags, three of which are given to each post.')
+    parser.add_argument('--containers', default=2, type=int,
+        help='The number of containers besides the posts.')
+    parser.add_argument('--container-items', default=100, type=int,
+        help='The number of items in each container.')
+    parser.add_argument('--assets', default=500, type=int,
+        help='The number of asset files.')
+    parser.add_argument('--asset-size', default=16384, type=int,
+        help='The size of each asset file in bytes.')
+    parser.add_argument('--templates', default=5, type=int,
+        help='The number of partial templates included by the base layout.')
+    parser.add_argument('--feed-entries', default=None, type=int,
+        help='Sets feed_entries to bound the feed.')
+    parser.add_argument('--stub-parser', action='store_true',
+        help='Converts posts with a trivial parser instead of pandoc.')
+
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as directory:
+        src, dest = op.join(directory, 'src'), op.join(directory, 'dest')
+        argv = ['-q', 'gen', src, dest]
+
+        start = perf_counter()
+        posts = generate(src, args)
+        generated = perf_counter() - start
+
+        builds = {}
+        builds['full'] = build(directory, argv, args.stub_parser)
+        builds['noop'] = build(directory, argv, args.stub_parser)
+
+        if posts:
+            _write(posts[len(posts) // 2], '\nAn edited paragraph.\n', 'a')
+
+        builds['edit'] = build(directory, argv, args.stub_parser)
+
+    json.dump({
+        'site': {name: value for name, value in vars(args).items()},
+        'generate_seconds': round(generated, 4),
+        'builds': builds,
+    }, sys.stdout, indent = 2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
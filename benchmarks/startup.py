@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Measures how long peppermynt takes to start.
+
+Runs each command in a new interpreter several times and reports the best
+wall time, along with the cumulative import time of peppermynt.main from
+`-X importtime`. It also lists the heavy third-party modules loaded by each
+command, which should be none for commands that build nothing. With
+--budget-ms, it exits non-zero if importing peppermynt.main takes longer
+than the budget.
+
+    $ python benchmarks/startup.py --budget-ms 100
+"""
+
+from argparse import ArgumentParser
+from subprocess import run
+from time import perf_counter
+import sys
+
+
+HEAVY = ('pkg_resources', 'doit', 'jinja2', 'yaml', 'pygments', 'watchdog', 'pypandoc', 'markdown')
+
+COMMANDS = {
+    'import': 'import peppermynt.main',
+    'version': 'import sys; sys.argv = ["peppermynt", "-V"]\n'
+        'from peppermynt.main import main\n'
+        'try:\n'
+        '    main()\n'
+        'except SystemExit:\n'
+        '    pass',
+    'serve args': 'from peppermynt.core import Peppermynt; Peppermynt(["serve", "_site"])',
+}
+
+_REPORT = """
+import sys
+sys.stdout.flush()
+sys.stderr.write('\\nheavy: ' + ' '.join(name for name in {0!r} if name in sys.modules) + '\\n')
+"""
+
+
+def wall(code, repeat):
+    best = None
+
+    for _ in range(repeat):
+        start = perf_counter()
+        run([sys.executable, '-c', code], check = True, capture_output = True)
+        elapsed = perf_counter() - start
+
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def heavy(code):
+    result = run([sys.executable, '-c', code + _REPORT.format(HEAVY)],
+        check = True, capture_output = True, text = True)
+
+    return result.stderr.rsplit('heavy:', 1)[1].split()
+
+
+def import_time(module):
+    """Returns the cumulative import time of `module` in seconds."""
+    result = run([sys.executable, '-X', 'importtime', '-c', 'import {0}'.format(module)],
+        check = True, capture_output = True, text = True)
+
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split('|')]
+
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1e6
+
+
+def main():
+    parser = ArgumentParser(description = 'Benchmarks the startup time of peppermynt.')
+
+    parser.add_argument('--repeat', default=5, type=int,
+        help='The number of runs of each command; the best is reported.')
+    parser.add_argument('--budget-ms', default=None, type=float,
+        help='Fails if importing peppermynt.main takes longer than this.')
+
+    args = parser.parse_args()
+
+    baseline = wall('pass', args.repeat)
+    imported = import_time('peppermynt.main')
+
+    print('interpreter:      {0:.3f}s'.format(baseline))
+    print('import time:      {0:.3f}s'.format(imported))
+
+    for name, code in COMMANDS.items():
+        print('{0:<17} {1:.3f}s (heavy: {2})'.format(name + ':', wall(code, args.repeat),
+            ', '.join(heavy(code)) or 'none'))
+
+    if args.budget_ms is not None and imported * 1000 > args.budget_ms:
+        print('over budget:      {0:.1f}ms > {1:.1f}ms'.format(imported * 1000, args.budget_ms))
+
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Measures how long a new process takes to get its templates ready.
+
+Generates a _templates directory of layouts that extend a base layout and
+import a shared macro file. For each setting it then forks a new process,
+which creates a renderer and renders every layout once, like the first
+pages of a `peppermynt gen` run. The settings are no bytecode cache, a cold
+cache and a warm one. Finally, it times the precompile step on a cold cache
+and on a warm one.
+
+    $ python benchmarks/template_startup.py --layouts 40 --macros 60
+"""
+
+from argparse import ArgumentParser
+from multiprocessing import get_context
+from os import makedirs, path as op
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from peppermynt.renderers.jinja import Renderer
+
+
+_MACRO = """{{% macro block_{0}(items, title = 'Block {0}') %}}
+<section class="block-{0}">
+  <h2>{{{{ title|title }}}}</h2>
+  {{% for item in items %}}
+    {{% if loop.first %}}<ul>{{% endif %}}
+    <li class="{{{{ loop.cycle('odd', 'even') }}}}">{{{{ item|e }}}} {{{{ loop.index }}}}/{{{{ loop.length }}}}</li>
+    {{% if loop.last %}}</ul>{{% endif %}}
+  {{% else %}}
+    <p>Nothing in block {0}.</p>
+  {{% endfor %}}
+</section>
+{{% endmacro %}}
+"""
+
+_BASE = """<!DOCTYPE html>
+<html>
+<head><title>{% block title %}{{ site.title }}{% endblock %}</title></head>
+<body>
+<nav>{% for link in links %}<a href="{{ get_url(link) }}">{{ link }}</a>{% endfor %}</nav>
+{% block content %}{% endblock %}
+<footer>{% block footer %}{{ site.title }}{% endblock %}</footer>
+</body>
+</html>
+"""
+
+_LAYOUT = """{{% extends 'base.html' %}}
+{{% import 'macros.html' as macros %}}
+{{% block title %}}Layout {0} - {{{{ super() }}}}{{% endblock %}}
+{{% block content %}}
+{1}
+{{% endblock %}}
+"""
+
+
+def generate(src, layouts, macros):
+    templates = op.join(src, '_templates')
+
+    makedirs(templates)
+
+    with open(op.join(templates, 'macros.html'), 'w') as f:
+        f.write(''.join(_MACRO.format(i) for i in range(macros)))
+
+    with open(op.join(templates, 'base.html'), 'w') as f:
+        f.write(_BASE)
+
+    for i in range(layouts):
+        calls = '\n'.join('{{{{ macros.block_{0}(items) }}}}'.format((i + j) % macros) for j in range(10))
+
+        with open(op.join(templates, 'layout-{0}.html'.format(i)), 'w') as f:
+            f.write(_LAYOUT.format(i, calls))
+
+    return ['layout-{0}.html'.format(i) for i in range(layouts)]
+
+
+def _render(src, cache, layouts, conn):
+    start = perf_counter()
+
+    renderer = Renderer(src, {}, cache = cache)
+    renderer.register({'site': {'title': 'Startup', 'base_url': '/', 'domain': None}})
+
+    for layout in layouts:
+        renderer.render(layout, {'links': ['a/', 'b/'], 'items': ['x', 'y', 'z']})
+
+    conn.send(perf_counter() - start)
+
+
+def _precompile(src, cache, _layouts, conn):
+    start = perf_counter()
+    count = Renderer(src, {}, cache = cache).precompile()
+
+    conn.send((perf_counter() - start, count))
+
+
+def run(target, src, cache, layouts):
+    """Runs `target` in a fresh process, so no compiled template is left in memory."""
+    context = get_context('fork')
+    parent, child = context.Pipe(False)
+    process = context.Process(target = target, args = (src, cache, layouts, child))
+
+    process.start()
+    result = parent.recv()
+    process.join()
+
+    return result
+
+
+def main():
+    parser = ArgumentParser(description = 'Benchmarks template compilation at startup.')
+
+    parser.add_argument('--layouts', default=40, type=int,
+        help='The number of layouts, each extending the base layout.')
+    parser.add_argument('--macros', default=60, type=int,
+        help='The number of macros in the shared macro file.')
+
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as directory:
+        src = op.join(directory, 'src')
+        layouts = generate(src, args.layouts, max(args.macros, 1))
+
+        uncached = run(_render, src, None, layouts)
+        cold = run(_render, src, op.join(directory, 'render'), layouts)
+        warm = run(_render, src, op.join(directory, 'render'), layouts)
+
+        precompile_cold, count = run(_precompile, src, op.join(directory, 'precompile'), layouts)
+        precompile_warm, _ = run(_precompile, src, op.join(directory, 'precompile'), layouts)
+
+    print('templates:        {0}'.format(count))
+    print('no cache:         {0:.3f}s'.format(uncached))
+    print('cold cache:       {0:.3f}s'.format(cold))
+    print('warm cache:       {0:.3f}s ({1:.1f}x)'.format(warm, uncached / warm))
+    print('precompile cold:  {0:.3f}s'.format(precompile_cold))
+    print('precompile warm:  {0:.3f}s'.format(precompile_warm))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compares per-post and batched conversion with the tufte parser.
+
+Requires pandoc (2.17 or newer for batching) and pandoc-sidenote. Without
+pandoc-sidenote, pandoc leaves footnotes as they are, so comparing the
+output says nothing about sidenote numbering.
+
+    $ python benchmarks/tufte_batch.py --posts 200 --batch-size 100
+"""
+
+from argparse import ArgumentParser
+from random import Random
+from time import time
+
+from peppermynt.parsers.tufte import Parser
+
+
+_WORDS = ('sidenote', 'margin', 'typography', 'column', 'figure', 'epigraph',
+    'pandoc', 'mathjax', 'static', 'site', 'generator', 'tufte', 'prose')
+
+
+def markdown(random, paragraphs):
+    blocks = []
+
+    for i in range(paragraphs):
+        words = ' '.join(random.choice(_WORDS) for _ in range(60))
+        blocks.append('# Section {0}\n\n{1}[^{0}] *with* "quotes" and $x^{0}$.\n\n[^{0}]: A note.'.format(i, words))
+
+    return '\n\n'.join(blocks)
+
+
+def main():
+    parser = ArgumentParser(description = 'Benchmarks batched tufte conversion.')
+
+    parser.add_argument('--posts', default=100, type=int,
+        help='The number of synthetic posts to convert.')
+    parser.add_argument('--paragraphs', default=5, type=int,
+        help='The number of sections in each post.')
+    parser.add_argument('--batch-size', default=100, type=int,
+        help='The number of posts sent to each pandoc run.')
+
+    args = parser.parse_args()
+
+    random = Random(0)
+    posts = [markdown(random, args.paragraphs) for _ in range(args.posts)]
+
+    single = Parser()
+    batched = Parser({'batch': True, 'batch_size': args.batch_size})
+
+    start = time()
+    expected = [single.parse(post) for post in posts]
+    single_time = time() - start
+
+    start = time()
+    actual = batched.parse_batch(posts)
+    batch_time = time() - start
+
+    print('posts:     {0}'.format(args.posts))
+    print('per-post:  {0:.3f}s ({1:.1f}ms/post)'.format(single_time, 1000 * single_time / args.posts))
+    print('batched:   {0:.3f}s ({1:.1f}ms/post)'.format(batch_time, 1000 * batch_time / args.posts))
+    print('speedup:   {0:.1f}x'.format(single_time / batch_time))
+    print('identical: {0}'.format(expected == actual))
+    print('sidenotes: {0}'.format('active' if 'footnote-ref' not in single.parse('Text.[^1]\n\n[^1]: Note.')
+        else 'inactive, so notes were not compared'))
+
+
+if __name__ == '__main__':
+    main()
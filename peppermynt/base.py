@@ -12,21 +12,38 @@ class Parser(object):
     def parse(self, content):
         raise NotImplementedError('A parser must implement parse.')
 
+    def parse_batch(self, contents):
+        return [self.parse(content) for content in contents]
+
     def setup(self):
         pass
 
+    def version(self):
+        return ''
+
 
 class Renderer(object):
-    def __init__(self, path, options = None, globals_ = None):
+    def __init__(self, path, options = None, globals_ = None, cache = None, cache_size = 0):
         self.path = path
         self.options = options if options is not None else {}
         self.globals = globals_ if globals_ is not None else {}
+        self.cache = cache
+        self.cache_size = cache_size
 
         self.setup()
 
+    def dependencies(self, template):
+        return []
+
     def from_string(self, string, data = None):
         raise NotImplementedError('A renderer must implement from_string.')
 
+    def invalidate(self):
+        pass
+
+    def precompile(self):
+        return 0
+
     def register(self, key, value):
         raise NotImplementedError('A renderer must implement register.')
 
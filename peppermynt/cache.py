@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+from hashlib import sha1
+from os import makedirs, path as op, remove, scandir, stat, utime
+import pickle
+
+from peppermynt.fs import atomic
+from peppermynt.utils import get_logger
+
+
+logger = get_logger('peppermynt')
+
+
+class Cache:
+    """A content-addressed store of strings on disk with a size limit.
+
+    Each entry is a file named after its key. Reading an entry touches its
+    mtime, so when the cache grows past `limit` bytes the entries with the
+    oldest mtimes, i.e. the least recently used ones, are evicted first.
+    """
+    def __init__(self, directory, limit):
+        self.directory = directory
+        self.limit = limit
+
+        self.hits, self.misses = 0, 0
+
+        self._size = None
+
+    @staticmethod
+    def key(*parts):
+        digest = sha1()
+
+        for part in parts:
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\0')
+
+        return digest.hexdigest()
+
+    def _entries(self):
+        if not self.directory.exists:
+            return
+
+        for shard in scandir(self.directory.path):
+            if shard.is_dir():
+                for entry in scandir(shard.path):
+                    if entry.is_file() and not entry.name.endswith('.tmp'):
+                        yield entry
+
+    def _path(self, key):
+        return op.join(self.directory.path, key[:2], key)
+
+    def evict(self):
+        entries = []
+
+        for entry in self._entries():
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        entries.sort()
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        target = self.limit * 3 // 4
+
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+
+            try:
+                remove(path)
+            except OSError:
+                continue
+
+            size -= entry_size
+
+        logger.debug('..  evicted cache entries in %s, %d bytes remain', self.directory.path, size)
+
+        self._size = size
+
+    def get(self, key):
+        path = self._path(key)
+
+        try:
+            with open(path, 'r', encoding = 'utf-8') as f:
+                value = f.read()
+
+            utime(path)
+        except OSError:
+            self.misses += 1
+
+            return None
+
+        self.hits += 1
+
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        data = value.encode('utf-8')
+        size = self.size
+
+        makedirs(op.dirname(path), exist_ok = True)
+
+        with atomic(path) as tmp, open(tmp, 'wb') as f:
+            f.write(data)
+
+        self._size = size + len(data)
+
+        if self._size > self.limit:
+            self.evict()
+
+    @property
+    def size(self):
+        if self._size is None:
+            self._size = sum(e.stat().st_size for e in self._entries())
+
+        return self._size
+
+
+class Index:
+    """A persistent map from source files to data derived from them.
+
+    An entry is only returned while its file's mtime and size are unchanged,
+    and the whole index is discarded when `signature` changes. Entries that
+    weren't looked up or set since the index was loaded are dropped when it's
+    saved, so deleted files don't linger.
+    """
+    def __init__(self, path, signature):
+        self.path = path
+        self.signature = signature
+
+        self.hits, self.misses = 0, 0
+
+        self._entries = {}
+        self._seen = {}
+        self._dirty = False
+        self._loaded = False
+
+    @staticmethod
+    def _key(path):
+        s = stat(path)
+
+        return s.st_mtime_ns, s.st_size
+
+    def get(self, path, stat = None):
+        if not self._loaded:
+            self.load()
+
+        key = self._key(path) if stat is None else (stat.st_mtime_ns, stat.st_size)
+        entry = self._entries.get(path)
+
+        if entry is None or entry[0] != key:
+            self.misses += 1
+
+            return None
+
+        self.hits += 1
+        self._seen[path] = entry
+
+        return entry[1]
+
+    def load(self):
+        self._loaded = True
+
+        try:
+            with open(self.path, 'rb') as f:
+                signature, entries = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.debug('..  discarding unreadable index %s: %s', self.path, e)
+
+            return
+
+        if signature == self.signature:
+            self._entries = entries
+
+    def save(self):
+        if not self._dirty and len(self._seen) == len(self._entries):
+            return
+
+        makedirs(op.dirname(self.path), exist_ok = True)
+
+        with atomic(self.path) as tmp, open(tmp, 'wb') as f:
+            pickle.dump((self.signature, self._seen), f, pickle.HIGHEST_PROTOCOL)
+
+        self._entries, self._seen = self._seen, {}
+        self._dirty = False
+
+    def release(self):
+        """Frees the entries held in memory; they're loaded again when next needed."""
+        self._entries, self._seen = {}, {}
+        self._dirty, self._loaded = False, False
+
+    def set(self, path, value, stat = None):
+        key = self._key(path) if stat is None else (stat.st_mtime_ns, stat.st_size)
+
+        self._seen[path] = (key, value)
+        self._dirty = True
+
+    def unseen(self):
+        """Returns the entries that haven't been looked up or set since loading."""
+        if not self._loaded:
+            self.load()
+
+        return {path: entry[1] for path, entry in self._entries.items() if path not in self._seen}
@@ -1,12 +1,9 @@
 #!/usr/bin/env python
 
-from os import chdir, getcwd
-
 from doit.cmd_base import Command
 
 from ..exceptions import OptionException
 from ..fs import Directory
-from ..server import RequestHandler, Server
 from ..utils import Url, get_logger
 
 
@@ -25,19 +22,18 @@ class Serve(Command):
         if not self.src.exists:
             raise OptionException('Source must exist.')
 
+        from ..server import RequestHandler, Server
+
         self.logger.info('>> Serving at 127.0.0.1:%s', self.args.port)
         self.logger.info('Press ctrl+c to stop.')
 
-        cwd = getcwd()
-        self.server = Server(('', self.args.port), base_url, RequestHandler)
-
-        chdir(self.src.path)
+        self.server = Server(('', self.args.port), base_url, RequestHandler,
+            directory = self.src.path, cache_size = self.args.cache_size * 1024 ** 2)
 
         try:
             self.server.serve_forever()
         except KeyboardInterrupt:
-            self.server.shutdown()
-            chdir(cwd)
+            self.server.server_close()
 
             # why?
             print('')
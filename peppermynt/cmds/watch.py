@@ -2,16 +2,18 @@
 
 from time import sleep
 
-from doit.cmd_auto import Auto as DoitAuto
 from doit.cmd_base import Command
-from watchdog.observers import Observer
 
-from ..fs import Directory, EventHandler
+from ..fs import Directory
 from ..exceptions import OptionException
 from ..utils import get_logger
 
 
 class PeppermyntWatchCmd(Command):
+    doc_purpose = "rebuild a website whenever its source changes"
+    doc_usage = "SRC DEST"
+    doc_description = None
+
     def __init__(self, *args, **kwargs):
         self.logger = get_logger('peppermynt')
         super().__init__(*args, **kwargs)
@@ -27,16 +29,22 @@ class PeppermyntWatchCmd(Command):
             raise OptionException('Source must exist.')
         elif self.src == self.dest:
             raise OptionException('Source and destination must differ.')
-        elif self.dest.exists and not args.force:
+        elif self.dest.exists and not self.args.force:
             raise OptionException('Destination already exists.',
-                'the -f flag must be passed to force watching by emptying the destination every time a change is made')
+                'the -f flag must be passed to force watching by rebuilding the destination in place first')
+
+        self.peppermynt.rebuild()
 
         self.logger.info('>> Watching')
         self.logger.info('Press ctrl+c to stop.')
 
+        from watchdog.observers import Observer
+
+        from ..watcher import EventHandler
+
         self.observer = Observer()
 
-        self.observer.schedule(EventHandler(self.src.path, self.peppermynt.regenerate), self.src.path, True)
+        self.observer.schedule(EventHandler(self.src.path, self.peppermynt.rebuild, self.args.delay), self.src.path, recursive=True)
         self.observer.start()
 
         try:
@@ -50,9 +58,5 @@ class PeppermyntWatchCmd(Command):
         self.observer.join()
 
 
-class WatchBase(DoitAuto):
-    pass
-
-
-class Watch(WatchBase):
+class Watch(PeppermyntWatchCmd):
     pass
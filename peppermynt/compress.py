@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+from concurrent.futures import ThreadPoolExecutor
+from os import remove, scandir, stat, utime
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from peppermynt.fs import atomic
+from peppermynt.trace import tracer
+from peppermynt.utils import get_logger
+
+
+logger = get_logger('peppermynt')
+
+
+EXTENSIONS = ('.css', '.htm', '.html', '.js', '.json', '.svg', '.txt', '.xml')
+
+# compressing tiny files only costs the client a Content-Encoding header
+MIN_SIZE = 256
+
+
+def _gzip(data):
+    return gzip.compress(data, 9, mtime = 0)
+
+def _brotli(data):
+    return brotli.compress(data)
+
+# every suffix a sidecar can have, whether or not its encoder is available
+SIDECARS = ('.gz', '.br')
+
+ENCODERS = [('.gz', _gzip)] + ([('.br', _brotli)] if brotli is not None else [])
+
+
+def _outputs(directory):
+    for entry in scandir(directory):
+        if entry.is_dir(follow_symlinks = False):
+            yield from _outputs(entry.path)
+        elif entry.name.endswith(EXTENSIONS + SIDECARS) and entry.is_file():
+            yield entry
+
+def _output_of(path):
+    """Returns the file `path` is a sidecar of, or None if it isn't one."""
+    for suffix in SIDECARS:
+        if path.endswith(suffix) and path[:-len(suffix)].endswith(EXTENSIONS):
+            return path[:-len(suffix)]
+
+    return None
+
+def _orphaned(path, outputs):
+    # a sidecar that won't be rewritten would be served with stale content
+    output = outputs.get(_output_of(path))
+
+    if output is None or output.stat().st_size < MIN_SIZE:
+        return True
+
+    return not any(path.endswith(suffix) for suffix, _ in ENCODERS)
+
+def _stale(entry, assets):
+    s = entry.stat()
+
+    if s.st_size < MIN_SIZE:
+        return []
+
+    stale = []
+
+    for suffix, encoder in ENCODERS:
+        if entry.path + suffix in assets:
+            continue
+
+        try:
+            fresh = stat(entry.path + suffix).st_mtime_ns == s.st_mtime_ns
+        except FileNotFoundError:
+            fresh = False
+
+        if not fresh:
+            stale.append((suffix, encoder))
+
+    return stale
+
+def _compress(path, encoders):
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    s = stat(path)
+
+    for suffix, encoder in encoders:
+        with atomic(path + suffix) as tmp:
+            with open(tmp, 'wb') as f:
+                f.write(encoder(data))
+
+            # the sidecar's mtime records which version of the output it was made from
+            utime(tmp, ns = (s.st_atime_ns, s.st_mtime_ns))
+
+    return path
+
+def precompress(directory, workers = None, exclude = (), assets = ()):
+    """Writes compressed sidecars next to the compressible files in `directory`.
+
+    A .gz sidecar, and a .br one when brotli is installed, is (re)written only
+    when its mtime differs from its file's, so unchanged outputs are skipped.
+    zlib and brotli release the GIL, so the work is spread over a thread pool.
+    Sidecars whose file is gone or has shrunk below MIN_SIZE are removed, as
+    are .br ones when brotli isn't installed. Files in `exclude` are treated
+    as though they weren't there. Files in `assets` were synced from the
+    source, so they're never removed or overwritten, even when they're named
+    like a sidecar.
+    """
+    with tracer.span('precompress', 'assets'):
+        outputs, sidecars = {}, []
+
+        for entry in _outputs(directory):
+            if entry.path in exclude:
+                continue
+
+            if entry.name.endswith(EXTENSIONS):
+                outputs[entry.path] = entry
+            elif _output_of(entry.path) is not None and entry.path not in assets:
+                sidecars.append(entry.path)
+
+        for path in sidecars:
+            if _orphaned(path, outputs):
+                logger.debug('..  rm: %s', path)
+                remove(path)
+
+        jobs = [(entry.path, encoders) for entry in outputs.values() for encoders in (_stale(entry, assets), ) if encoders]
+
+        with ThreadPoolExecutor(workers) as pool:
+            for path in pool.map(lambda job: _compress(*job), jobs):
+                logger.debug('..  compressed %s', path)
+
+    tracer.flush()
+
+    if jobs:
+        logger.info('Compressed %d of the files in %s', len(jobs), directory)
@@ -3,9 +3,10 @@
 from collections import OrderedDict
 from datetime import datetime
 from itertools import tee, chain
+from math import ceil
+from sys import intern
 from pathlib import Path
 from collections import namedtuple
-from html.parser import HTMLParser
 
 import os.path as op
 import yaml
@@ -15,42 +16,12 @@ from peppermynt.fs import Directory
 from peppermynt.utils import get_logger, dest_path, normpath, Url
 
 
-yaml.add_constructor('tag:yaml.org,2002:str', lambda loader, node: loader.construct_scalar(node))
+# the libyaml bindings are much faster when PyYAML was built with them
+_Loader = getattr(yaml, 'CLoader', yaml.Loader)
 
-logger = get_logger('mynt')
-
-
-class PostContentParser(HTMLParser):
-    """A simple HTML parser to extract the content of the article tag.
-
-    If there is more than one article tag their contents will be concatenated,
-    but it's the nature of Peppermynt posts that they'll have one article tag
-    per post unless you're doing something really funky.
-    """
-    def __init__(self):
-        super().__init__()
-        self._in_article = False
-        self.post_content = ''
-
-    def handle_starttag(self, tag, attrs):
-        if tag == 'article':
-            self._in_article = True
+yaml.add_constructor('tag:yaml.org,2002:str', lambda loader, node: loader.construct_scalar(node), Loader = _Loader)
 
-    def handle_endtag(self, tag):
-        if tag == 'article':
-            self._in_article = False
-
-    def handle_data(self, data):
-        if self._in_article:
-            self.post_content += data
-
-    @classmethod
-    def extract_article_content(cls, file_path):
-        """Return the article tag content from a (presumably HTML) file."""
-        parser = cls()
-        with open(file_path, 'r', encoding='utf-8') as input_file:
-            parser.feed(input_file.read().strip())
-        return parser.post_content
+logger = get_logger('mynt')
 
 
 class Config(dict):
@@ -58,7 +29,7 @@ class Config(dict):
         super(Config, self).__init__()
 
         try:
-            self.update(yaml.load(string))
+            self.update(yaml.load(string, Loader = _Loader))
         except yaml.YAMLError:
             raise ConfigException('Config contains unsupported YAML.')
         except:
@@ -98,25 +69,35 @@ class Data:
 class Item(dict):
     # Typical keys:
     # 'date', 'timestamp', 'tags', 'url', 'layout', 'title', 'summary', 'prev', 'next'
-    # 'raw_content' is the markdown input; it gets replaced with 'content' when the item is parsed
+    # 'raw_content' is a Body referring to the markdown input, which is only read from disk
+    # when the item is parsed; it gets replaced with 'content' and 'excerpt' then, which are
+    # also kept in the reader's content cache so later builds and feeds needn't parse again
+    # Anything that isn't a key lives in slots, so that items don't each carry a __dict__
+    __slots__ = ('_src', '_period')
+
     def __init__(self, src, *args, **kwargs):
         super(Item, self).__init__(*args, **kwargs)
 
-        self.__src = src
+        self._src = src
+        self._period = None
 
     def __str__(self):
-        return self.__src
+        return self._src
+
+    @property
+    def period(self):
+        """Return the year and month the item is archived under."""
+        if self._period is None:
+            year, month = datetime.utcfromtimestamp(self['timestamp']).strftime('%Y %B').split()
+            self._period = (intern(year), intern(month))
+
+        return self._period
 
     def output_path(self, dest_root):
         return dest_path(dest_root, self['url'])
 
     def extension(self):
-        return op.splitext(op.basename(self.__src))[1]
-
-    def read_content(self, output_file_path):
-        if not self.get('content', None):
-            self['content'] = PostContentParser.extract_article_content(output_file_path)
-        return self['content']
+        return op.splitext(op.basename(self._src))[1]
 
 
 class Tag:
@@ -135,9 +116,30 @@ class Page(namedtuple('PageBase', 'template data url')):
     def identifier(self):
         return self.url or self.template
 
+    def members(self):
+        """Return the items listed on a tag or archive page.
+
+        Returns None for pages that aren't tied to particular items, such as
+        miscellany pages, which can use anything in the site.
+        """
+        if not self.data:
+            return None
+
+        if 'tag' in self.data:
+            return self.data['tag'].items
+
+        if 'archive' in self.data:
+            return list(chain.from_iterable(self.data['archive']['months'].values()))
+
+        if 'index' in self.data:
+            return self.data['index']
+
+        return None
+
 
 class Container:
     def __init__(self, name, src, config):
+        self._items = None
         self._pages = None
 
         self.name = name
@@ -158,6 +160,7 @@ class Container:
 
     def add(self, item):
         self.data.items[item['url']] = item
+        self._items = None
 
     def archive(self):
         pass
@@ -174,7 +177,10 @@ class Container:
 
     @property
     def items(self):
-        return list(self.data.items.values())
+        if self._items is None:
+            self._items = list(self.data.items.values())
+
+        return self._items
 
     @property
     def pages(self):
@@ -199,14 +205,22 @@ class Items(Container):
 
         self.path = Directory(normpath(src.path, '_containers', self.name))
 
+        self._archive_urls = {}
+
+    def _archive_url(self, year):
+        if year not in self._archive_urls:
+            self._archive_urls[year] = Url.from_format(self.config['archives_url'], year)
+
+        return self._archive_urls[year]
+
     def _archive(self, items, archive):
         for item in items:
-            year, month = datetime.utcfromtimestamp(item['timestamp']).strftime('%Y %B').split()
+            year, month = item.period
 
             if year not in archive:
                 archive[year] = {
                     'months': OrderedDict({month: [item]}),
-                    'url': Url.from_format(self.config['archives_url'], year),
+                    'url': self._archive_url(year),
                     'year': year
                 }
             elif month not in archive[year]['months']:
@@ -214,25 +228,81 @@ class Items(Container):
             else:
                 archive[year]['months'][month].append(item)
 
+    def _paginate(self, template, url, items, data, paged):
+        """Return the pages listing `items`, `paginate` items at a time.
+
+        Without pagination that's a single page with `data`. Otherwise each
+        page gets `paged(items)` for its slice of the items, along with its
+        number and the URLs of the pages before and after it.
+        """
+        size = self.config.get('paginate')
+
+        if not size:
+            return [Page(template, data, url)]
+
+        count = max(1, ceil(len(items) / size))
+        urls = [Url.paginate(url, number) for number in range(1, count + 1)]
+        pages = []
+
+        for i, page_url in enumerate(urls):
+            page_data = paged(items[i * size:(i + 1) * size])
+            page_data['pagination'] = {
+                'number': i + 1,
+                'pages': count,
+                'prev': urls[i - 1] if i > 0 else None,
+                'next': urls[i + 1] if i + 1 < count else None
+            }
+
+            pages.append(Page(template, page_data, page_url))
+
+        return pages
+
+    def _archive_page(self, archive, items):
+        archives = OrderedDict()
+        self._archive(items, archives)
+
+        return {'archive': archives[archive['year']]}
+
+    def _tag_page(self, tag, items):
+        page_tag = Tag(tag.name, tag.url, tag.count, items, OrderedDict())
+        self._archive(items, page_tag.archives)
+
+        return {'tag': page_tag}
+
     def _get_pages(self):
         pages = super(Items, self)._get_pages()
 
         if self.config['archive_layout'] and self.archives:
             for archive in self.archives.values():
-                pages.append(Page(
+                pages.extend(self._paginate(
                     self.config['archive_layout'],
+                    archive['url'],
+                    list(chain.from_iterable(archive['months'].values())),
                     {'archive': archive},
-                    archive['url']
+                    lambda items, archive = archive: self._archive_page(archive, items)
                 ))
 
         if self.config['tag_layout'] and self.tags:
             for tag in self.tags.values():
-                pages.append(Page(
+                pages.extend(self._paginate(
                     self.config['tag_layout'],
+                    tag.url,
+                    tag.items,
                     {'tag': tag},
-                    tag.url
+                    lambda items, tag = tag: self._tag_page(tag, items)
                 ))
 
+        if self.config.get('index_layout'):
+            items = self.items
+
+            pages.extend(self._paginate(
+                self.config['index_layout'],
+                self.config['index_url'],
+                items,
+                {'index': items},
+                lambda items: {'index': items}
+            ))
+
         return pages
 
     def _relate(self):
@@ -266,6 +336,7 @@ class Items(Container):
             key=self.config['sort'],
             reverse=self._sort_descending()
         )
+        self._items = None
         self._relate()
 
     def _sort_descending(self):
@@ -310,7 +381,10 @@ class Posts(Items):
         config = {
             'archives_url': 'archives_url',
             'archive_layout': 'archive_layout',
+            'index_layout': 'index_layout',
+            'index_url': 'index_url',
             'order': 'posts_order',
+            'paginate': 'paginate',
             'sort': 'posts_sort',
             'tags_url': 'tags_url',
             'tag_layout': 'tag_layout',
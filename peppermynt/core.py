@@ -1,46 +1,42 @@
 # -*- coding: utf-8 -*-
 
 from argparse import ArgumentParser
+from collections import OrderedDict
 from copy import deepcopy
 from glob import iglob
+from heapq import nlargest
 from itertools import chain
 from os import path as op
 from tempfile import gettempdir
+import json
 import locale
 import logging
 import os
 import re
-
-from doit.doit_cmd import DoitMain
-from pkg_resources import resource_filename
+import sys
 
 from peppermynt import __version__
-from .containers import Config
+from .cache import Cache
+from .compress import precompress
+from .manifest import manifest
 from .exceptions import ConfigException, OptionException
 from .fs import Directory, File
-from .processors import Reader, Writer
-from .task_loader import PeppermyntTaskLoader
-from .utils import get_logger, normpath, Timer, Url
-from .cmds import Generate, Gen, Serve, Watch # , Init, Watch, Serve
-
+from .sync import prune, sync, synced
+from .trace import tracer
+from .utils import get_logger, normpath, Url
 
-logger = get_logger('peppermynt')
+# doit, the readers and writers, parser plugins, the watcher and the server,
+# and through them jinja2, pygments, pypandoc, watchdog and yaml, are imported
+# where they're first used, so that commands that don't build anything, like
+# serve or --version, don't pay for them
 
 
-class DoitPeppermynt(DoitMain):
-    """Peppermynt-specific DoitMain."""
-
-    DOIT_CMDS = list(DoitMain.DOIT_CMDS) + [Generate, Gen, Serve]
-    TASK_LOADER = PeppermyntTaskLoader
+logger = get_logger('peppermynt')
 
-    def __init__(self, peppermynt, *args, **kwargs):
-        """Initialize DoitPeppermynt."""
-        kwargs.setdefault('extra_config', {})
-        kwargs['extra_config']['PEPPERMYNT'] = { 'peppermynt': peppermynt }
-        kwargs['extra_config']['GLOBAL'] = {'verbosity': 2 }
-        super().__init__(*args, **kwargs)
-        peppermynt.doit = self
-        self.task_loader = self.TASK_LOADER(peppermynt)
+# doit's own commands, which are passed through to it; doit is pinned to a
+# single version, so they're listed here rather than imported from it
+DOIT_CMDS = ('auto', 'clean', 'dumpdb', 'forget', 'help', 'ignore', 'info', 'list', 'resetdep', 'run',
+    'strace', 'tabcompletion')
 
 
 class Peppermynt:
@@ -52,9 +48,18 @@ class Peppermynt:
         'containers': {},
         'date_format': '%A, %B %d, %Y',
         'domain': None,
+        'feed_entries': None,
+        'hardlink_assets': False,
         'include': [],
+        'index_layout': None,
+        'index_url': None,
         'locale': None,
+        'manifest': None,
+        'paginate': None,
+        'parse_cache_size': 256,
         'posts_order': 'desc',
+        'precompile_templates': False,
+        'precompress': False,
         'posts_sort': 'timestamp',
         'posts_url': '/<year>/<month>/<day>/<slug>/',
         'pygmentize': True,
@@ -67,7 +72,10 @@ class Peppermynt:
     container_defaults = {
         'archive_layout': None,
         'archives_url': '/',
+        'index_layout': None,
+        'index_url': None,
         'order': 'desc',
+        'paginate': None,
         'sort': 'timestamp',
         'tag_layout': None,
         'tags_url': '/'
@@ -81,12 +89,16 @@ class Peppermynt:
 
         self.src, self.dest, self.temp = None, None, None
 
-        self.args, self.doit_args = self._get_args(args)
+        self.argv = sys.argv[1:] if args is None else list(args)
+        self.args, self.doit_args = self._get_args(self.argv)
 
         self._reader, self._writer = None, None
 
         logger.setLevel(self.args.level)
 
+        if getattr(self.args, 'trace', None):
+            tracer.enable(op.abspath(self.args.trace))
+
         # if self.args.cmd:
         #     self.doit = DoitPeppermynt(self.args.task_loader(self.args))
         # elif self.args.func:
@@ -142,9 +154,20 @@ class Peppermynt:
         force.add_argument(
             '-f', '--force',
             action='store_true',
-            help='Forces generation by emptying the destination if it exists.'
+            help='Forces generation by rebuilding every output in place and removing stale ones.'
         )
 
+        gen.add_argument('--delta',
+            metavar='path',
+            help='Writes the outputs added or changed since the last build to the given tar archive.')
+
+        gen.add_argument('--trace',
+            metavar='path',
+            help='Writes a Chrome trace of the build to the given file.')
+        gen.add_argument('--trace-top',
+            default=10, type=int,
+            help='Sets how many of the slowest pages and templates a trace lists.')
+
         gen.set_defaults(doit_cmd='generate')
 
         init = sub.add_parser('init')
@@ -181,6 +204,9 @@ class Peppermynt:
         serve.add_argument('-p', '--port',
             default=8080, type=int,
             help='Sets the port used by the server.')
+        serve.add_argument('--cache-size',
+            default=64, type=int,
+            help='Sets how many megabytes of small files the server keeps in memory.')
 
         serve.set_defaults(doit_cmd='serve')
 
@@ -197,14 +223,16 @@ class Peppermynt:
             help='Sets the site\'s base URL overriding the config setting.')
         watch.add_argument('-f', '--force',
             action='store_true',
-            help='Forces watching by emptying the destination every time a change is made if it exists.')
+            help='Forces watching by rebuilding every output in place before the first build.')
         watch.add_argument('--locale',
             help='Sets the locale used by the renderer.')
+        watch.add_argument('--delay',
+            default=0.2, type=float,
+            help='Sets how many seconds to wait for more changes before rebuilding.')
 
-        watch.set_defaults(doit_cmd='watch')
+        watch.set_defaults(doit_cmd='watch', clean=False)
 
-        for cmd in DoitMain.DOIT_CMDS:
-            cmd_name = cmd.__name__.lower()
+        for cmd_name in DOIT_CMDS:
             doit_cmd = sub.add_parser(cmd_name)
             doit_cmd.set_defaults(doit_cmd=cmd_name)
 
@@ -215,7 +243,7 @@ class Peppermynt:
         return peppermynt_args, doit_args
 
     def _get_theme(self, theme):
-        return resource_filename(__name__, 'themes/{0}'.format(theme))
+        return normpath(op.dirname(op.abspath(__file__)), 'themes', theme)
 
     def update_config(self):
         self.config = deepcopy(self.defaults)
@@ -233,6 +261,8 @@ class Peppermynt:
             logger.debug('..  no config file found')
 
     def _update_config_from_file(self, f):
+        from .containers import Config
+
         logger.debug('..  found: %s', f.path)
 
         try:
@@ -245,11 +275,20 @@ class Peppermynt:
         self.config['assets_url'] = Url.join(self.config['assets_url'], '')
         self.config['base_url'] = Url.join(self.args.base_url or self.config['base_url'], '')
 
-        for setting in ('archives_url', 'posts_url', 'tags_url'):
-            self.config[setting] = Url.join(self.config[setting])
+        # an index at the site root would overwrite its index.html
+        if self.config['index_layout'] and not self.config['index_url']:
+            raise ConfigException(
+                'Invalid config setting.',
+                'setting: index_url',
+                'index_url must be set along with index_layout'
+            )
+
+        for setting in ('archives_url', 'index_url', 'posts_url', 'tags_url'):
+            if self.config[setting] is not None:
+                self.config[setting] = Url.join(self.config[setting])
 
-        for setting in ('archives_url', 'assets_url', 'base_url', 'posts_url', 'tags_url'):
-            if re.search(r'(?:^\.{2}/|/\.{2}$|/\.{2}/)', self.config[setting]):
+        for setting in ('archives_url', 'assets_url', 'base_url', 'index_url', 'posts_url', 'tags_url'):
+            if self.config[setting] is not None and re.search(r'(?:^\.{2}/|/\.{2}$|/\.{2}/)', self.config[setting]):
                 raise ConfigException(
                     'Invalid config setting.',
                     'setting: {0}'.format(setting),
@@ -264,6 +303,13 @@ class Peppermynt:
             config.update((k, v) for k, v in self.container_defaults.items() if k not in config)
             config['url'] = url
 
+            if config['index_layout'] and not config['index_url']:
+                raise ConfigException(
+                    'Invalid config setting.',
+                    'setting: containers:{0}:index_url'.format(name),
+                    'index_url must be set along with index_layout'
+                )
+
         for pattern in self.config['include']:
             if op.commonprefix((self.src.path, normpath(self.src.path, pattern))) != self.src.path:
                 raise ConfigException(
@@ -308,7 +354,8 @@ class Peppermynt:
 
             logger.debug('>> Initializing\n..  src:  %s\n..  dest: %s', self.src.path, self.dest.path)
 
-            self.update_config()
+            with tracer.span('config', 'config'):
+                self.update_config()
 
             if self.config['locale']:
                 try:
@@ -319,10 +366,10 @@ class Peppermynt:
             self.writer.register({'site': self.config})
 
     def _init_parse(self):
-        Timer.start()
         logger.info('>> Parsing frontmatter')
 
-        self.content = self.reader.init_parse()
+        with tracer.span('frontmatter', 'frontmatter') as span:
+            self.content = self.reader.init_parse()
 
         self.data['posts'] = self.content.posts.data
         self.data['containers'] = {}
@@ -330,7 +377,16 @@ class Peppermynt:
         for name, container in self.content.containers.items():
             self.data['containers'][name] = container.data
 
-        logger.info('<< Completed frontmatter parsing in %.3fs', Timer.stop())
+        logger.info('<< Completed frontmatter parsing in %.3fs', span.duration)
+
+    def load(self):
+        self._initialize()
+        self._init_parse()
+        self.writer.register(self.data)
+
+        self._pages = {page.identifier(): page for page in chain(self.content.pages, self.content.feeds)}
+        self._config_signature = Cache.key(json.dumps(self.config, sort_keys = True, default = str))
+        self._signature = None
 
     def _render(self):
         logger.info('>> Rendering')
@@ -341,13 +397,10 @@ class Peppermynt:
             self.content.pages[i] = self.writer.render(*page)
 
     def create_dirs_tasks(self):
+        # -f rebuilds in place, so outputs that come out the same keep their
+        # mtimes, and prunes the stale ones once everything has been written
         if self.dest.exists:
-            if self.args.force:
-                yield {
-                    'basename': f'empty {self.dest.path}',
-                    'actions': [(self.dest.empty, [])]
-                }
-            elif self.args.clean:
+            if self.args.clean:
                 yield {
                     'basename': f'rm {self.dest.path}',
                     'actions': [(self.dest.rm, [])]
@@ -378,245 +431,388 @@ class Peppermynt:
             'actions': ['true'],
         }
 
+    def _item_pages(self):
+        return [page for page in self.content.pages if page.data and 'item' in page.data]
+
+    def parse_items(self, changed):
+        items = [page.data['item'] for page in self._item_pages()]
+
+        if not self._fresh():
+            changed = set(changed)
+            items = [item for item in items if str(item) in changed]
+
+        self.reader.parse_items(self.config, items)
+
+    def parse_items_task(self):
+        return {
+            'basename': 'parse items',
+            'file_dep': [str(page.data['item']) for page in self._item_pages()],
+            'task_dep': self._dest_task_dep,
+            'actions': [(parse_items_action, (self.argv, ))],
+            'uptodate': [not self._fresh()],
+            'verbosity': 0,
+        }
+
     def render_to_file_action(self, *args):
         out_file = self.writer.render(*args)
-        out_file.mk()
 
-    def _new_adjacent_item(self, adjacent_item):
-        return False if adjacent_item is None else not File(adjacent_item.output_path(self.dest.path)).exists
+        with tracer.span('write', 'write', path = out_file.path):
+            out_file.mk()
+
+    def render_page(self, identifier):
+        page = self._pages[identifier]
+
+        if page.data and 'item' in page.data:
+            self.parse_item_action(page.data['item'])
+        elif page.data and 'index' in page.data:
+            # an index lists its posts' content or excerpts, which a worker
+            # process may not have parsed yet
+            self.reader.parse_items(self.config, page.members())
+
+        self.render_to_file_action(*page)
+
+    def _adjacent_signature(self, item):
+        adjacent = (item.get('prev'), item.get('next'))
+
+        return Cache.key(*(None if a is None else self._item_signature(a) for a in adjacent))
+
+    @staticmethod
+    def _item_signature(item):
+        return (item['url'], item.get('title'), item['date'], item['timestamp'], item.get('tags'))
+
+    def _site_signature(self):
+        if self._signature is None:
+            items = chain(self.content.posts.items, *(c.items for c in self.content.containers.values()))
+
+            self._signature = self._members_signature(None, items)
+
+        return self._signature
+
+    def _members_signature(self, template, members):
+        signatures = []
+
+        for item in members:
+            stat = os.stat(str(item))
+            signatures.append((self._item_signature(item), stat.st_mtime_ns, stat.st_size))
+
+        return Cache.key(template, self._config_signature, *signatures)
+
+    def _page_signature(self, page):
+        members = page.members()
+
+        if members is None:
+            # pages that can use anything in the site change along with any item
+            return Cache.key(page.template, self._site_signature())
+
+        if 'index' in page.data:
+            # indexes show their posts' content too, so edits to it count
+            return Cache.key(self._members_signature(page.template, members), page.data.get('pagination'))
+
+        return Cache.key(page.template, self._config_signature, page.data.get('pagination'),
+            *(self._item_signature(item) for item in members))
 
     def render_task(self, page):
+        from doit.tools import config_changed
+
         _template, data, _url = page
         common_params = {
             'basename': f'render {page.identifier()}',
+            'actions': [(render_page_action, (self.argv, page.identifier()))],
             'targets': [self.writer.render_path(*page)],
         }
         if data and 'item' in data:
             return {
-                'file_dep': [str(data['item'])],
-                'actions': [
-                    (self.parse_item_action, (data['item'], )),
-                    (self.render_to_file_action, tuple(page)),
-                ],
-                # make sure we re-render if we've added a new post before or after this one,
-                # to create the prev/next links
-                'uptodate': [
-                    not self._new_adjacent_item(data['item'].get('next')),
-                    not self._new_adjacent_item(data['item'].get('prev')),
-                ],
+                'file_dep': [str(data['item'])] + self.writer.dependencies(page.template),
+                'task_dep': self._dest_task_dep + ['parse items'],
+                # make sure we re-render if a post was added, removed or retitled before or
+                # after this one, to update the prev/next links
+                'uptodate': [config_changed(self._adjacent_signature(data['item'])), not self._fresh()],
                 **common_params
             }
 
         return {
-            'actions': [(self.render_to_file_action, tuple(page))],
+            'file_dep': self.writer.dependencies(page.template),
+            'task_dep': self._dest_task_dep,
+            'uptodate': [config_changed(self._page_signature(page)), not self._fresh()],
             **common_params
         }
 
-    @staticmethod
-    def read_content_action(item, render_path):
-        item.read_content(render_path)
+    def _feed_items(self):
+        items = list(self.content.posts.data)
+        limit = self.config['feed_entries']
 
-    def read_content_task(self, page):
-        _template, data, _url = page
-        if data and 'item' in data:
-            return {
-                'basename': f'read content for {page.identifier()}',
-                'actions': [
-                    (self.read_content_action, (data['item'], self.writer.render_path(*page)))
-                ],
-                'file_dep': [self.writer.render_path(*page)],
-                'uptodate': [False],
-            }
+        if limit and len(items) > limit:
+            latest = {id(item) for item in nlargest(limit, items, key = lambda item: item['timestamp'])}
+            items = [item for item in items if id(item) in latest]
 
-        return {
-            'basename': f'read content for {page.identifier()}',
-            'actions': ['true'],
-        }
+        return items
+
+    def render_feed(self, identifier):
+        from .containers import Data
+
+        template, _data, url = self._pages[identifier]
+
+        if not self.config['feed_entries']:
+            # items parsed in other worker processes get their content from the reader's cache
+            self.reader.parse_items(self.config, [page.data['item'] for page in self._item_pages()])
+            self.render_to_file_action(template, None, url)
+
+            return
+
+        items = self._feed_items()
+        posts = self.content.posts.data
+
+        self.reader.parse_items(self.config, items)
+        self.render_to_file_action(template, {
+            'posts': Data(items = OrderedDict((item['url'], item) for item in items), archives = posts.archives, tags = posts.tags)
+        }, url)
 
     def render_feed_task(self, feed):
+        from doit.tools import config_changed
+
+        if self.config['feed_entries']:
+            # a bounded feed only changes along with its own entries
+            signature = self._members_signature(feed.template, self._feed_items())
+        else:
+            signature = self._page_signature(feed)
+
         return {
             'basename': f'render {feed.identifier()}',
-            'task_dep': [
-                f'read content for {post.identifier()}'
-                for post in self.content.posts.pages
-            ],
-            'actions': [(self.render_to_file_action, tuple(feed))],
+            'task_dep': self._dest_task_dep + ['parse items'],
+            'file_dep': self.writer.dependencies(feed.template),
+            'actions': [(render_feed_action, (self.argv, feed.identifier()))],
+            'uptodate': [config_changed(signature), not self._fresh()],
             'targets': [self.writer.render_path(*feed)],
         }
 
-    @staticmethod
-    def mk_asset_dir_action(asset_dir):
-        asset_dir.mk()
+    def _sync_pairs(self):
+        pairs = [(
+            normpath(self.src.path, '_assets'),
+            normpath(self.dest.path, *self.config['assets_url'].split('/'))
+        )]
 
-    @staticmethod
-    def cp_file_action(src_file, dest_file_path):
-        src_file.cp(dest_file_path)
-
-    def copy_assets_tasks(self):
-        assets_src = Directory(normpath(self.src.path, '_assets'))
-        assets_dest = Directory(normpath(self.dest.path, *self.config['assets_url'].split('/')))
-
-        yield {
-            'basename': f'make root asset directory {assets_dest.path}',
-            'actions': [(self.mk_asset_dir_action, (assets_dest, ))],
-            'targets': [assets_dest.path],
-            'uptodate': [True],
+        for pattern in self.config['include']:
+            for path in iglob(normpath(self.src.path, pattern)):
+                src = Directory(path) if op.isdir(path) else File(path)
+
+                if not src.should_ignore():
+                    pairs.append((src.path, path.replace(self.src.path, self.dest.path)))
+
+        return pairs
+
+    def _sync_index(self):
+        return normpath(self.temp.path, 'sync', '{0}.pickle'.format(Cache.key(self.src.path, self.dest.path)))
+
+    def sync_task(self):
+        return {
+            'basename': 'sync assets',
+            'task_dep': self._dest_task_dep,
+            'actions': [(sync, (self.dest.path, self._sync_pairs(), self._sync_index(), self.config['hardlink_assets']))],
+            'uptodate': [False],
         }
 
-        for (dirpath, dirnames, filenames) in os.walk(assets_src.path, True):
-            if Directory(dirpath).should_ignore():
-                continue
-           
-            for dirname in dirnames:
-                assets_dest_subdir = Directory(
-                    os.path.join(
-                        assets_dest.path,
-                        op.relpath(dirpath, assets_src.path),
-                        dirname
-                    )
-                )
-                if assets_dest_subdir.should_ignore():
-                    continue
-                yield {
-                    'basename': f'make asset subdirectory {assets_dest_subdir.path}',
-                    'actions': [(self.mk_asset_dir_action, (assets_dest_subdir, ))],
-                    'targets': [assets_dest_subdir.path],
-                    'uptodate': [True],
-                }
+    def prune_task(self, tasks):
+        targets = [target for task in tasks if task['basename'].startswith('render ') for target in task['targets']]
 
-            for filename in filenames:
-                assets_src_file = File(os.path.join(dirpath, filename))
-                assets_dest_file = File(
-                    os.path.join(
-                        assets_dest.path,
-                        op.relpath(dirpath, assets_src.path),
-                        filename
-                    )
-                )
-                if assets_src_file.should_ignore():
-                    continue
-                yield {
-                    # debug
-                    # 'title': lambda task: f'copy D: {task.file_dep}, CH: {task.dep_changed} > {task.targets}',
-                    'basename': f'copy asset {assets_src_file.path} -> {assets_dest_file.path}',
-                    'file_dep': [assets_src_file.path],
-                    'actions': [(self.cp_file_action, (assets_src_file, assets_dest_file.path))],
-                    'targets': [assets_dest_file.path],
-                    'verbosity': 0,
-                }
+        if self._manifest_name():
+            targets.append(normpath(self.dest.path, self._manifest_name()))
 
-    @staticmethod
-    def cp_include_dir_action(src_dir, dest_path):
-        src_dir.cp(dest_path, True)
+        return {
+            'basename': 'prune',
+            'task_dep': [task['basename'] for task in tasks],
+            'actions': [(prune, (self.dest.path, targets, self._sync_pairs(), self._sync_index()))],
+            'uptodate': [False],
+        }
 
-    def copy_includes_tasks(self):
-        for pattern in self.config['include']:
-            for path in iglob(normpath(self.src.path, pattern)):
-                dest = path.replace(self.src.path, self.dest.path)
-
-                if op.isdir(path):
-                    src_dir = Directory(path)
-                    if src_dir.should_ignore():
-                        continue
-                    yield {
-                        'basename': f'copy include directory {src_path.path}',
-                        'actions': [(self.cp_include_dir_action, (src_dir, dest))],
-                        'targets': [dest],
-                        'uptodate': [True],
-                    }
-                elif op.isfile(path):
-                    src_file = File(path)
-                    if src_file.should_ignore():
-                        continue
-                    yield {
-                        'basename': f'copy include file {src_file.path}',
-                        'file_dep': [src_file.path],
-                        'actions': [(self.cp_file_action, (src_file, dest))],
-                        'targets': [dest],
-                    }
+    def precompress_task(self, tasks):
+        exclude = [normpath(self.dest.path, self._manifest_name())] if self._manifest_name() else []
+
+        return {
+            'basename': 'precompress',
+            'task_dep': [task['basename'] for task in tasks],
+            # the manifest is written after precompress, so compressing it would ship a stale copy
+            'actions': [(precompress_action, (self.dest.path, exclude, self._sync_pairs(), self._sync_index(), self.config['hardlink_assets']))],
+            'uptodate': [False],
+        }
+
+    def _manifest_name(self):
+        if self.config['manifest']:
+            return self.config['manifest']
+
+        # an export needs a manifest to compare against
+        if getattr(self.args, 'delta', None):
+            return '.manifest.json'
+
+    def manifest_task(self, tasks):
+        delta = op.abspath(self.args.delta) if getattr(self.args, 'delta', None) else None
+
+        return {
+            'basename': 'manifest',
+            'task_dep': [task['basename'] for task in tasks],
+            'actions': [(manifest, (self.dest.path, self._manifest_name(), delta))],
+            'uptodate': [False],
+        }
 
     def generate_tasks(self):
-        self._initialize()
-        self._init_parse()
-        self.writer.register(self.data)
+        global _loaded
+
+        self.load()
+
+        if self.config['precompile_templates']:
+            self.writer.precompile()
+
+        # worker processes forked from this one can reuse the loaded site
+        _loaded = self
 
-        create_dirs_tasks = self.create_dirs_tasks() # this function should yield one or two things
+        create_dirs_tasks = list(self.create_dirs_tasks()) # this function should yield one or two things
+        # everything that writes to dest has to wait until it's been created or removed
+        self._dest_task_dep = [task['basename'] for task in create_dirs_tasks]
         # parse_pages_tasks = (self.parse_task(page) for page in self.content.pages)
+        parse_items_tasks = [self.parse_items_task()]
         render_pages_tasks = (self.render_task(page) for page in self.content.pages)
-        read_content_tasks = (self.read_content_task(page) for page in self.content.pages)
         render_feeds_tasks = (self.render_feed_task(feed) for feed in self.content.feeds)
-        copy_assets_tasks = self.copy_assets_tasks()
-        copy_includes_tasks = self.copy_includes_tasks()
+        sync_tasks = [self.sync_task()]
 
         task_chain = chain(
             create_dirs_tasks,
             # parse_pages_tasks,
+            parse_items_tasks,
             render_pages_tasks,
-            read_content_tasks,
             render_feeds_tasks,
-            copy_assets_tasks,
-            copy_includes_tasks
+            sync_tasks
         )
 
+        if self.args.force and self.dest.exists:
+            tasks = list(task_chain)
+            task_chain = chain(tasks, [self.prune_task(tasks)])
+
+        if self.config['precompress']:
+            tasks = list(task_chain)
+            task_chain = chain(tasks, [self.precompress_task(tasks)])
+
+        if self._manifest_name():
+            tasks = list(task_chain)
+            task_chain = chain(tasks, [self.manifest_task(tasks)])
+
         # doit expects specifically a generator, of which an itertools chain isn't one
         return (task for task in task_chain)
 
     def _fresh(self):
         return self.args.force or self.args.clean
 
-    def regenerate(self):
-        self._writer = None
+    def _adjacency(self):
+        if self.content is None:
+            return {}
 
-        self.config = None
-        self.content = None
-        self.data.clear()
+        return {
+            str(page.data['item']): (str(page.data['item'].get('prev')), str(page.data['item'].get('next')))
+            for page in self._item_pages()
+        }
 
-        self.generate_tasks()
+    def _affected_tasks(self, tasks, paths, adjacency):
+        names = set()
+        current = self._adjacency()
 
-    def generate(self):
-        Timer.start()
+        for task in tasks:
+            if paths.intersection(task.get('file_dep', ())):
+                names.add(task['basename'])
 
-        if not self.src.exists:
-            raise OptionException('Source must exist.')
-        elif self.src == self.dest:
-            raise OptionException('Source and destination must differ.')
-        elif self.dest.exists and not self._fresh():
-            raise OptionException('Destination already exists.',
-                'the -c or -f flag must be passed to force generation by deleting or emptying the destination')
+        for page in chain(self.content.pages, self.content.feeds):
+            if page.data and 'item' in page.data:
+                item = str(page.data['item'])
 
-        self._generate()
+                # a post added or removed next to this one changes its prev/next links
+                if item in adjacency and adjacency[item] != current[item]:
+                    names.add(f'render {page.identifier()}')
+            else:
+                # aggregate pages and feeds are skipped by doit unless their signature changed
+                names.add(f'render {page.identifier()}')
 
-        logger.info('Completed in %.3fs', Timer.stop())
+        # syncing only stats files that haven't changed
+        names.add('sync assets')
 
-    def init(self):
-        Timer.start()
+        for task in tasks:
+            if task['basename'] in ('precompress', 'manifest'):
+                # only wait for the tasks being rerun, or doit would check every other task too
+                task['task_dep'] = sorted(names)
+                names.add(task['basename'])
 
-        self.src = Directory(self._get_theme(self.args.theme))
-        self.dest = Directory(self.args.dest)
+        return sorted(names)
 
-        if not self.src.exists:
-            raise OptionException('Theme not found.')
-        elif self.dest.exists and not self._fresh():
-            raise OptionException('Destination already exists.',
-                'the -f flag must be passed to force initialization by deleting the destination')
+    def rebuild(self, paths = None):
+        """Build the site, keeping the renderer and parsers warm between calls.
 
-        logger.info('>> Initializing')
+        With `paths`, only the tasks affected by changes to those files are
+        handed to doit. A changed config starts over with a full build.
+        """
+        config_paths = {normpath(self.args.src, 'config' + ext) for ext in ('.yml', '.yaml')}
 
-        if self.args.bare:
-            self.dest.rm()
+        if paths is None or config_paths.intersection(paths):
+            self._reader, self._writer = None, None
+            paths = None
+        else:
+            self.writer.invalidate()
 
-            for d in ('_assets/css', '_assets/images', '_assets/js', '_templates', '_posts'):
-                Directory(normpath(self.dest.path, d)).mk()
+        adjacency = self._adjacency()
+        tasks = list(self.generate_tasks())
+        names = [] if paths is None else self._affected_tasks(tasks, set(paths), adjacency)
 
-            File(normpath(self.dest.path, 'config.yml')).mk()
-        else:
-            self.src.cp(self.dest.path, False)
+        if paths is not None and not names:
+            logger.info('..  nothing to rebuild')
+
+            return
+
+        from .doit_cmd import DoitPeppermynt
+
+        DoitPeppermynt(self, tasks = tasks).run(['generate'] + self.doit_args[1:] + names)
 
-        logger.info('Completed in %.3fs', Timer.stop())
+        # only the first build starts from an empty destination
+        self.args.force = False
+
+    def generate(self):
+        with tracer.span('generate', 'build') as span:
+            if not self.src.exists:
+                raise OptionException('Source must exist.')
+            elif self.src == self.dest:
+                raise OptionException('Source and destination must differ.')
+            elif self.dest.exists and not self._fresh():
+                raise OptionException('Destination already exists.',
+                    'the -c or -f flag must be passed to force generation by deleting the destination or rebuilding it in place')
+
+            self._generate()
+
+        logger.info('Completed in %.3fs', span.duration)
+
+    def init(self):
+        with tracer.span('init', 'build') as span:
+            self.src = Directory(self._get_theme(self.args.theme))
+            self.dest = Directory(self.args.dest)
+
+            if not self.src.exists:
+                raise OptionException('Theme not found.')
+            elif self.dest.exists and not self._fresh():
+                raise OptionException('Destination already exists.',
+                    'the -f flag must be passed to force initialization by deleting the destination')
+
+            logger.info('>> Initializing')
+
+            if self.args.bare:
+                self.dest.rm()
+
+                for d in ('_assets/css', '_assets/images', '_assets/js', '_templates', '_posts'):
+                    Directory(normpath(self.dest.path, d)).mk()
+
+                File(normpath(self.dest.path, 'config.yml')).mk()
+            else:
+                self.src.cp(self.dest.path, False)
+
+        logger.info('Completed in %.3fs', span.duration)
 
     @property
     def reader(self):
         if self._reader is None:
+            from .processors import Reader
+
             self._reader = Reader(self.src, self.temp, self.dest, self.config, self.writer)
 
         return self._reader
@@ -624,6 +820,51 @@ class Peppermynt:
     @property
     def writer(self):
         if self._writer is None:
+            from .processors import Writer
+
             self._writer = Writer(self.src, self.temp, self.dest, self.config)
 
         return self._writer
+
+
+# Task actions are module-level functions of the command line arguments and a
+# page identifier rather than bound methods, so that doit's multiprocess runner
+# only ships a few strings to its workers instead of the whole site. Each
+# worker loads the site at most once and reuses it for every task it runs.
+_loaded = None
+
+
+def _load(argv):
+    global _loaded
+
+    if _loaded is None or _loaded.argv != argv:
+        _loaded = Peppermynt(argv)
+        _loaded.load()
+
+    return _loaded
+
+
+def parse_items_action(argv, changed):
+    with tracer.span('parse items', 'task'):
+        _load(argv).parse_items(changed)
+
+    tracer.flush()
+
+
+def render_page_action(argv, identifier):
+    with tracer.span(identifier, 'task'):
+        _load(argv).render_page(identifier)
+
+    tracer.flush()
+
+
+def render_feed_action(argv, identifier):
+    with tracer.span(identifier, 'task'):
+        _load(argv).render_feed(identifier)
+
+    tracer.flush()
+
+
+def precompress_action(root, exclude, pairs, index, hardlink):
+    # an asset named like a sidecar, such as sitemap.xml.gz, isn't precompress's to remove
+    precompress(root, None, exclude, synced(pairs, index, hardlink))
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+from doit.doit_cmd import DoitMain
+
+from .cmds import Generate, Gen, Serve, Watch
+from .stats import stats
+from .task_loader import PeppermyntTaskLoader
+from .trace import summarize, tracer
+from .utils import get_logger
+
+
+logger = get_logger('peppermynt')
+
+
+class DoitPeppermynt(DoitMain):
+    """Peppermynt-specific DoitMain."""
+
+    DOIT_CMDS = list(DoitMain.DOIT_CMDS) + [Generate, Gen, Serve, Watch]
+    TASK_LOADER = PeppermyntTaskLoader
+
+    def __init__(self, peppermynt, *args, tasks = None, **kwargs):
+        """Initialize DoitPeppermynt.
+
+        If `tasks` is given, those task dicts are run instead of the ones
+        peppermynt would generate.
+        """
+        kwargs.setdefault('extra_config', {})
+        kwargs['extra_config']['PEPPERMYNT'] = { 'peppermynt': peppermynt }
+        kwargs['extra_config']['GLOBAL'] = {'verbosity': 2 }
+        super().__init__(*args, **kwargs)
+        peppermynt.doit = self
+        self.peppermynt = peppermynt
+        self.task_loader = self.TASK_LOADER(peppermynt, tasks)
+
+    def run(self, cmd_args):
+        tracer.reset()
+        stats.start()
+
+        try:
+            return super().run(cmd_args)
+        finally:
+            summarize(tracer.finish(), getattr(self.peppermynt.args, 'trace_top', 10))
+
+            if stats.get('written') or stats.get('unchanged'):
+                logger.info('Wrote %d files and left %d unchanged', stats.get('written'), stats.get('unchanged'))
@@ -2,20 +2,54 @@
 
 
 from codecs import open
+from contextlib import contextmanager
 from datetime import datetime
-from os import makedirs, path as op, remove, walk
-from re import search
+from os import getpid, makedirs, path as op, remove, replace, walk
+from re import match
 import shutil
-from sys import exc_info
-import traceback
-
-from watchdog.events import FileSystemEventHandler
 
 from peppermynt.exceptions import FileSystemException
-from peppermynt.utils import abspath, get_logger, normpath, Timer
+from peppermynt.stats import stats
+from peppermynt.utils import abspath, get_logger, normpath
+
+
+logger = get_logger('peppermynt')
+
+
+@contextmanager
+def atomic(path):
+    """Yields a temporary path to write in place of `path`.
+
+    The temporary file replaces `path` when the block exits, so readers never
+    see it half written, and is removed instead if the block raises.
+    """
+    tmp = '{0}.{1}.tmp'.format(path, getpid())
+
+    try:
+        yield tmp
+
+        replace(tmp, path)
+    except BaseException:
+        if op.lexists(tmp):
+            remove(tmp)
+
+        raise
+
+
+class Body:
+    """The part of a file that follows its frontmatter, read on demand."""
+
+    __slots__ = ('path', 'offset')
 
+    def __init__(self, path, offset):
+        self.path = path
+        self.offset = offset
 
-logger = get_logger('mynt')
+    def read(self):
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+
+            return f.read().decode('utf-8').lstrip()
 
 
 class Directory:
@@ -92,7 +126,11 @@ class Directory:
                 if f.startswith(('.', '_')):
                     continue
 
-                yield File(normpath(root, f))
+                path = normpath(root, f)
+
+                # walk starts from a real path and doesn't descend into linked
+                # directories, so only linked files need to be resolved
+                yield File(path, resolve = op.islink(path))
 
     def __ne__(self, other):
         return self.path != other
@@ -101,49 +139,14 @@ class Directory:
         return str(self.path)
 
 
-class EventHandler(FileSystemEventHandler):
-    def __init__(self, src, callback):
-        self._src = src
-        self._callback = callback
-
-    def _regenerate(self, path):
-        path = path.replace(self._src, '')
-
-        if search(r'/[._](?!assets|containers|posts|templates)', path):
-            logger.debug('>> Skipping: %s', path)
-        else:
-            logger.info('>> Change detected in: %s', path)
-
-            try:
-                Timer.start()
-
-                self._callback()
-
-                logger.info('Regenerated in %.3fs', Timer.stop())
-            except:
-                t, v, tb = exc_info()
-                lc = traceback.extract_tb(tb)[-1:][0]
-
-                logger.error('!! %s\n..  file: %s\n..  line: %s\n..    in: %s\n..    at: %s', v, *lc)
-
-                pass
-
-
-    def on_any_event(self, event):
-        if event.event_type != 'moved':
-            self._regenerate(event.src_path)
-
-    def on_moved(self, event):
-        self._regenerate(event.dest_path)
-
-
 class File:
-    def __init__(self, path, content = None):
-        self.path = abspath(path)
-        self.root = Directory(op.dirname(self.path))
+    def __init__(self, path, content = None, resolve = True):
+        self.path = abspath(path) if resolve else path
         self.name, self.extension = op.splitext(op.basename(self.path))
         self.content = content
 
+        self._root = None
+
     def should_ignore(self):
         return self.name.startswith(('.', '_'))
 
@@ -159,17 +162,74 @@ class File:
 
                 shutil.copyfile(self.path, dest.path)
 
+    def frontmatter(self):
+        """Read the file only as far as the end of its frontmatter.
+
+        Returns the frontmatter and the Body that follows it, or (None, None)
+        if the file doesn't start with a frontmatter block.
+        """
+        lines = []
+
+        with open(self.path, 'rb') as f:
+            if not match(rb'---\s*$', f.readline()):
+                return None, None
+
+            while True:
+                offset = f.tell()
+                line = f.readline()
+
+                if not line:
+                    return None, None
+
+                stripped = line.lstrip()
+
+                if lines and stripped.startswith(b'---'):
+                    offset += len(line) - len(stripped) + 3
+
+                    return b''.join(lines).decode('utf-8'), Body(self.path, offset)
+
+                if lines or stripped:
+                    lines.append(line)
+
+    def _holds(self, data):
+        try:
+            if op.getsize(self.path) != len(data):
+                return False
+
+            with open(self.path, 'rb') as f:
+                return f.read() == data
+        except OSError:
+            return False
+
     def mk(self):
+        """Write the content, unless the file already holds exactly that.
+
+        Leaving an identical file alone keeps its mtime, so deploys and
+        precompression don't see it as changed. Returns whether the file was
+        written.
+        """
+        if self._content is None:
+            self.content = ''
+
+        data = self._content.encode('utf-8')
+
+        if self._holds(data):
+            logger.debug('..  unchanged: %s', self.path)
+            stats.add('unchanged')
+
+            return False
+
         if not self.root.exists:
             self.root.mk()
 
         logger.debug('..  mk: %s', self.path)
 
-        with open(self.path, 'w', encoding = 'utf-8') as f:
-            if self.content is None:
-                self.content = ''
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+        stats.add('written')
 
-            f.write(self.content)
+        return True
 
     def rm(self):
         if self.exists:
@@ -194,6 +254,13 @@ class File:
     def exists(self):
         return op.isfile(self.path)
 
+    @property
+    def root(self):
+        if self._root is None:
+            self._root = Directory(op.dirname(self.path))
+
+        return self._root
+
     @property
     def mtime(self):
         if self.exists:
@@ -2,13 +2,16 @@
 
 import sys
 
-from peppermynt.core import Peppermynt, DoitPeppermynt
+from peppermynt.core import Peppermynt
 from peppermynt.exceptions import PeppermyntException
 
 
 def main():
     try:
         peppermynt = Peppermynt(args=sys.argv[1:])
+
+        from peppermynt.doit_cmd import DoitPeppermynt
+
         DoitPeppermynt(peppermynt).run(peppermynt.doit_args)
     except PeppermyntException as e:
         print(e)
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+from concurrent.futures import ThreadPoolExecutor
+from os import path as op, scandir
+import hashlib
+import json
+import tarfile
+
+from peppermynt.fs import atomic
+from peppermynt.trace import tracer
+from peppermynt.utils import get_logger
+
+
+logger = get_logger('peppermynt')
+
+
+def _outputs(root, directory):
+    for entry in scandir(directory):
+        if entry.name.startswith('.'):
+            continue
+
+        if entry.is_dir(follow_symlinks = False):
+            yield from _outputs(root, entry.path)
+        elif entry.is_file():
+            yield op.relpath(entry.path, root).replace(op.sep, '/'), entry
+
+
+def _hash(path):
+    digest = hashlib.sha256()
+
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Lists every output in the destination with its size and content hash.
+
+    The manifest is a JSON file in the destination, which `-f` leaves alone.
+    Each build compares the outputs with the previous manifest and records
+    which were added, changed and deleted since. A file is only hashed again
+    when its size or mtime differs from the manifest's. Unchanged outputs
+    aren't rewritten, so that's usually only the files the build wrote.
+    """
+    version = 1
+
+    def __init__(self, root, name, workers = None):
+        self.root = root
+        self.name = name
+        self.path = op.join(root, name)
+        self.workers = workers
+
+        self.files = {}
+        self.added, self.changed, self.deleted = [], [], []
+
+    def _previous(self):
+        try:
+            with open(self.path, 'r', encoding = 'utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+        if manifest.get('version') != self.version:
+            return {}
+
+        return manifest['files']
+
+    def update(self):
+        previous = self._previous()
+        jobs = []
+
+        for name, entry in _outputs(self.root, self.root):
+            if name == self.name:
+                continue
+
+            s = entry.stat()
+            known = previous.get(name)
+
+            if known is not None and (known['size'], known['mtime_ns']) == (s.st_size, s.st_mtime_ns):
+                self.files[name] = known
+            else:
+                self.files[name] = {'size': s.st_size, 'mtime_ns': s.st_mtime_ns, 'sha256': None}
+                jobs.append(name)
+
+        # hashlib releases the GIL while hashing large reads
+        with ThreadPoolExecutor(self.workers) as pool:
+            for name, digest in zip(jobs, pool.map(lambda name: _hash(op.join(self.root, name)), jobs)):
+                self.files[name]['sha256'] = digest
+
+        for name, entry in sorted(self.files.items()):
+            if name not in previous:
+                self.added.append(name)
+            elif previous[name]['sha256'] != entry['sha256']:
+                self.changed.append(name)
+
+        self.deleted = sorted(name for name in previous if name not in self.files)
+
+        logger.debug('..  hashed %d of %d outputs', len(jobs), len(self.files))
+
+    def save(self):
+        with atomic(self.path) as tmp, open(tmp, 'w', encoding = 'utf-8') as f:
+            json.dump({
+                'version': self.version,
+                'files': self.files,
+                'added': self.added,
+                'changed': self.changed,
+                'deleted': self.deleted,
+            }, f, indent = 1, sort_keys = True)
+
+    def export(self, path):
+        """Writes the added and changed outputs, and the manifest, to a tar archive.
+
+        The archive is compressed when `path` ends in .gz, .tgz, .bz2 or .xz.
+        The manifest lists the deleted outputs for the deploy to remove.
+        """
+        mode = 'w'
+
+        for suffixes, compression in ((('.gz', '.tgz'), 'gz'), (('.bz2', ), 'bz2'), (('.xz', ), 'xz')):
+            if path.endswith(suffixes):
+                mode = 'w:' + compression
+
+        with tarfile.open(path, mode) as tar:
+            for name in self.added + self.changed:
+                tar.add(op.join(self.root, name), name, recursive = False)
+
+            tar.add(self.path, op.basename(self.path), recursive = False)
+
+
+def manifest(root, name, delta = None):
+    with tracer.span('manifest', 'assets'):
+        m = Manifest(root, name)
+        m.update()
+        m.save()
+
+        if delta is not None:
+            m.export(delta)
+
+    tracer.flush()
+
+    logger.info('Manifest: %d added, %d changed and %d deleted of %d outputs',
+        len(m.added), len(m.changed), len(m.deleted), len(m.files))
+
+    if delta is not None:
+        logger.info('Exported %d files to %s', len(m.added) + len(m.changed), delta)
@@ -0,0 +1,108 @@
+-- Converts a batch of documents in a single pandoc run.
+--
+-- The sources are read from the file named by the `peppermynt-batch`
+-- metadata field, split on `peppermynt-separator` and parsed one at a time
+-- with `peppermynt-format`, so identifiers and references never leak between
+-- documents. The JSON filters named by `peppermynt-filters` are run once over
+-- all of the documents, and each document is then written with the writer
+-- options given on the command line. The fragments are joined with the same
+-- separator and returned as a single raw block.
+--
+-- pandoc-sidenote numbers its notes with a counter that runs across the
+-- whole batch, so each document's `sn-N` ids are renumbered to start from 0,
+-- as they would when the document is converted on its own.
+
+local stringify = pandoc.utils.stringify
+
+local function split(text, separator)
+  local parts, start = {}, 1
+
+  while true do
+    local i, j = text:find(separator, start, true)
+
+    if not i then
+      table.insert(parts, text:sub(start))
+
+      return parts
+    end
+
+    table.insert(parts, text:sub(start, i - 1))
+    start = j + 1
+  end
+end
+
+local function list(value)
+  if value == nil then
+    return {}
+  elseif type(value) == 'string' then
+    return {value}
+  end
+
+  return value
+end
+
+-- the attributes pandoc-sidenote puts on each note's label and checkbox
+local NOTE_IDS = {'(for="sn%-)(%d+)(")', '(id="sn%-)(%d+)(")'}
+
+local function renumber(doc)
+  local first
+
+  doc:walk({
+    RawInline = function(raw)
+      for _, pattern in ipairs(NOTE_IDS) do
+        for _, n in raw.text:gmatch(pattern) do
+          n = tonumber(n)
+
+          if first == nil or n < first then
+            first = n
+          end
+        end
+      end
+    end
+  })
+
+  if first == nil or first == 0 then
+    return doc
+  end
+
+  return doc:walk({
+    RawInline = function(raw)
+      for _, pattern in ipairs(NOTE_IDS) do
+        raw.text = raw.text:gsub(pattern, function(prefix, n, suffix)
+          return prefix .. (tonumber(n) - first) .. suffix
+        end)
+      end
+
+      return raw
+    end
+  })
+end
+
+function Pandoc(doc)
+  local separator = stringify(doc.meta['peppermynt-separator'])
+  local format = stringify(doc.meta['peppermynt-format'])
+
+  local f = assert(io.open(stringify(doc.meta['peppermynt-batch']), 'rb'))
+  local sources = split(f:read('a'), separator)
+  f:close()
+
+  local blocks = {}
+
+  for _, source in ipairs(sources) do
+    table.insert(blocks, pandoc.Div(pandoc.read(source, format).blocks))
+  end
+
+  local merged = pandoc.Pandoc(blocks)
+
+  for _, filter in ipairs(list(doc.meta['peppermynt-filters'])) do
+    merged = pandoc.utils.run_json_filter(merged, stringify(filter))
+  end
+
+  local fragments = {}
+
+  for _, div in ipairs(merged.blocks) do
+    table.insert(fragments, pandoc.write(renumber(pandoc.Pandoc(div.content)), 'html', PANDOC_WRITER_OPTIONS))
+  end
+
+  return pandoc.Pandoc({pandoc.RawBlock('html', table.concat(fragments, separator))})
+end
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+from importlib.util import find_spec
+
+from peppermynt.base import Parser as _Parser
+
+
+# Markdown itself is imported in setup, so check for it here, where a missing
+# requirement keeps the plugin from loading
+if find_spec('markdown') is None:
+    raise ImportError('No module named \'markdown\'', name = 'markdown')
+
+
+class Parser(_Parser):
+    """Converts Markdown in process, marking it up like the tufte parser does.
+
+    Footnotes become sidenotes and margin notes, headers open sections, and
+    $-delimited math is left for MathJax, as with pandoc, pandoc-sidenote and
+    the tufte parser's flags. Fenced code is highlighted by peppermynt itself.
+    """
+    accepts = ('.md', '.markdown')
+
+    def parse(self, markdown_):
+        self._md.reset()
+
+        return self._md.convert(markdown_) + '\n'
+
+    def version(self):
+        from markdown import __version__
+
+        return 'Markdown {0}'.format(__version__)
+
+    def setup(self):
+        import markdown
+
+        from peppermynt.parsers.sidenotes import TufteExtension
+
+        self._md = markdown.Markdown(
+            extensions = ['attr_list', 'fenced_code', 'footnotes', 'sane_lists', 'smarty', TufteExtension()] + self.options.get('extensions', []),
+            extension_configs = {
+                'smarty': {
+                    'substitutions': {
+                        'left-single-quote': '‘',
+                        'right-single-quote': '’',
+                        'left-double-quote': '“',
+                        'right-double-quote': '”',
+                        'ellipsis': '…',
+                        'ndash': '–',
+                        'mdash': '—',
+                    }
+                }
+            },
+            output_format = 'xhtml'
+        )
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+
+from copy import deepcopy
+from html import unescape
+import re
+import xml.etree.ElementTree as etree
+
+from markdown.extensions import Extension
+from markdown.extensions.footnotes import NBSP_PLACEHOLDER
+from markdown.extensions.toc import run_postprocessors, strip_tags
+from markdown.inlinepatterns import InlineProcessor
+from markdown.postprocessors import Postprocessor
+from markdown.treeprocessors import Treeprocessor
+from markdown.util import AtomicString
+
+
+# pandoc's tex_math_dollars: the opening $ can't be followed by a space, and
+# the closing one can't be preceded by a space or followed by a digit
+DISPLAY_MATH_RE = r'(?<!\\)\$\$(.+?)\$\$'
+INLINE_MATH_RE = r'(?<![\\$])\$(?![\s$])((?:[^$\\]|\\.)+?)(?<!\s)\$(?!\d)'
+
+HEADERS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+
+def _identifier(text):
+    # pandoc's auto_identifiers
+    text = ''.join(c for c in text.lower() if c.isalnum() or c in '_-.' or c.isspace())
+    text = '-'.join(text.split())
+
+    return re.sub(r'^[^a-z]+', '', text) or 'section'
+
+
+def _is_note(element):
+    return element.tag == 'span' and element.get('class') in ('marginnote', 'sidenote')
+
+
+def _is_note_ref(element):
+    return element.tag == 'sup' and element.get('id', '').startswith('fnref')
+
+
+class _MathProcessor(InlineProcessor):
+    def __init__(self, pattern, md, display):
+        super().__init__(pattern, md)
+
+        self.display = display
+
+    def handleMatch(self, m, data):
+        element = etree.Element('span')
+
+        if self.display:
+            element.set('class', 'math display')
+            element.text = AtomicString('\\[{0}\\]'.format(m.group(1)))
+        else:
+            element.set('class', 'math inline')
+            element.text = AtomicString('\\({0}\\)'.format(m.group(1)))
+
+        return element, m.start(0), m.end(0)
+
+
+class _SectionTreeprocessor(Treeprocessor):
+    """Wraps each header and what follows it in a section, like pandoc's --section-divs."""
+    def _text(self, element):
+        parts = [element.text or '']
+
+        labels = self.md.treeprocessors['sidenotes'].labels
+
+        # pandoc takes a note's label, but not its text, into the identifier
+        for child in element:
+            if _is_note(child):
+                parts.append(labels.get(child, ''))
+            else:
+                parts.append(self._text(child))
+
+            parts.append(child.tail or '')
+
+        return ''.join(parts)
+
+    def _figure(self, element):
+        # an image alone in a paragraph is a figure captioned with its alt text
+        if len(element) != 1 or (element.text or '').strip() or element[0].tag != 'img':
+            return element
+
+        image = element[0]
+
+        if (image.tail or '').strip() or not image.get('alt'):
+            return element
+
+        figure = etree.Element('figure')
+        figure.text, figure.tail = '\n', element.tail
+
+        image.tail = '\n'
+        figure.append(image)
+
+        caption = etree.SubElement(figure, 'figcaption', {'aria-hidden': 'true'})
+        caption.text, caption.tail = image.get('alt'), '\n'
+
+        return figure
+
+    def run(self, root):
+        for element in root.iter():
+            if element.tag == 'ol':
+                element.set('type', '1')
+            elif element.tag == 'a' and element.text and element.text == element.get('href'):
+                element.set('class', 'uri')
+
+        children = [self._figure(child) if child.tag == 'p' else child for child in root]
+        used = {element.get('id') for element in root.iter() if element.get('id')}
+        sections = []
+
+        for child in list(root):
+            root.remove(child)
+
+        for child in children:
+            if child.tag in HEADERS:
+                level = int(child.tag[1])
+
+                while sections and sections[-1][0] >= level:
+                    sections.pop()
+
+                identifier = child.attrib.pop('id', None)
+
+                if identifier is None:
+                    base = _identifier(unescape(strip_tags(run_postprocessors(self._text(child), self.md))))
+                    identifier, i = base, 0
+
+                    while identifier in used:
+                        i += 1
+                        identifier = '{0}-{1}'.format(base, i)
+
+                used.add(identifier)
+
+                section = etree.Element('section', {
+                    'id': identifier,
+                    'class': ' '.join(['level{0}'.format(level)] + child.get('class', '').split())
+                })
+                section.text, section.tail = '\n', '\n'
+
+                (sections[-1][1] if sections else root).append(section)
+                sections.append((level, section))
+
+            (sections[-1][1] if sections else root).append(child)
+
+
+class _SidenoteTreeprocessor(Treeprocessor):
+    """Turns footnotes into Tufte sidenotes, the way pandoc-sidenote does.
+
+    Each reference becomes a label, a checkbox that toggles the note on
+    narrow screens, and a span holding the note's paragraphs, each followed by
+    two line breaks. Other blocks in a note are dropped. A note starting with
+    `{-}` becomes an unnumbered margin note.
+    """
+    def __init__(self, md = None):
+        super().__init__(md)
+
+        self.labels = {}
+
+    def _content(self, note):
+        content = []
+
+        for block in note:
+            if block.tag != 'p':
+                continue
+
+            block = deepcopy(block)
+
+            for backref in [child for child in block if child.tag == 'a' and child.get('class') == 'footnote-backref']:
+                block.remove(backref)
+
+            # like pandoc-sidenote, drop notes within notes; an element without
+            # a tag is serialized as just its tail
+            for ref in [element for element in block.iter('sup') if _is_note_ref(element)]:
+                tail = ref.tail
+                ref.clear()
+                ref.tag, ref.tail = None, tail
+
+            if block.text:
+                block.text = block.text.replace(NBSP_PLACEHOLDER, '')
+
+            for child in block:
+                if child.tail:
+                    child.tail = child.tail.replace(NBSP_PLACEHOLDER, '')
+
+            # the backlinks get a paragraph of their own when a note ends with another block
+            if len(block) or (block.text or '').strip():
+                content.append(block)
+
+        return content
+
+    def _sidenote(self, i, content):
+        margin = bool(content) and (content[0].text or '').startswith('{-}')
+
+        if margin:
+            content[0].text = content[0].text[3:].lstrip()
+
+        label = etree.Element('label', {
+            'for': 'sn-{0}'.format(i),
+            'class': 'margin-toggle' if margin else 'margin-toggle sidenote-number'
+        })
+        label.text = '⊕' if margin else ''
+
+        toggle = etree.Element('input', {'type': 'checkbox', 'id': 'sn-{0}'.format(i), 'class': 'margin-toggle'})
+        span = etree.Element('span', {'class': 'marginnote' if margin else 'sidenote'})
+        last = None
+
+        for block in content:
+            if last is None:
+                span.text = block.text
+            else:
+                last.tail = (last.tail or '') + (block.text or '')
+
+            for child in block:
+                span.append(child)
+                last = child
+
+            for _ in range(2):
+                last = etree.SubElement(span, 'br')
+                last.tail = '\n'
+
+        return [label, toggle, span]
+
+    def run(self, root):
+        self.labels = {}
+        footnotes = [child for child in root if child.tag == 'div' and child.get('class') == 'footnote']
+
+        if not footnotes:
+            return
+
+        notes = {}
+
+        for div in footnotes:
+            root.remove(div)
+
+            for ol in div.iter('ol'):
+                for li in ol:
+                    notes.setdefault(li.get('id'), li)
+
+                break
+
+        parents = {child: parent for parent in root.iter() for child in parent}
+        i = 0
+
+        for ref in [element for element in root.iter('sup') if _is_note_ref(element)]:
+            parent = parents[ref]
+            note_id = ref[0].get('href', '#')[1:] if len(ref) else ''
+            note = notes.get(note_id)
+            elements = self._sidenote(i, self._content(note) if note is not None else [])
+            self.labels[elements[-1]] = note_id.partition(':')[2]
+            position = list(parent).index(ref)
+
+            elements[-1].tail = ref.tail
+            parent.remove(ref)
+
+            for element in reversed(elements):
+                parent.insert(position, element)
+
+            i += 1
+
+
+class _CodePostprocessor(Postprocessor):
+    # fenced code is marked up for peppermynt's own highlighting
+    def run(self, text):
+        return re.sub(r'<pre><code class="language-([^"\s]+)">', r'<pre><code data-lang="\1">', text)
+
+
+class TufteExtension(Extension):
+    def extendMarkdown(self, md):
+        md.ESCAPED_CHARS.append('$')
+
+        md.inlinePatterns.register(_MathProcessor(DISPLAY_MATH_RE, md, True), 'display_math', 186)
+        md.inlinePatterns.register(_MathProcessor(INLINE_MATH_RE, md, False), 'inline_math', 185)
+
+        # after attr_list and smarty have run, so ids and quotes are final
+        md.treeprocessors.register(_SidenoteTreeprocessor(md), 'sidenotes', 5)
+        md.treeprocessors.register(_SectionTreeprocessor(md), 'sections', 4)
+
+        md.postprocessors.register(_CodePostprocessor(md), 'code', 15)
@@ -1,21 +1,97 @@
+from hashlib import sha1
 from itertools import chain
-
-import pypandoc
+from os import path as op, remove
+import re
+from tempfile import NamedTemporaryFile
+from uuid import uuid4
 
 from peppermynt.base import Parser as _Parser
+from peppermynt.exceptions import ParserException
 
 
 class Parser(_Parser):
     accepts = ('.md', '.markdown')
 
+    format = 'markdown+smart+raw_tex+yaml_metadata_block-pipe_tables+grid_tables'
+    filters = ['pandoc-sidenote']
+
+    def _parse_batch(self, markdowns):
+        import pypandoc
+
+        separator = 'peppermynt-{0}'.format(uuid4().hex)
+
+        with NamedTemporaryFile('w', encoding = 'utf-8', suffix = '.md', delete = False) as f:
+            f.write('\n\n{0}\n\n'.format(separator).join(markdowns))
+
+        try:
+            html = pypandoc.convert_text(
+                '', 'html',
+                extra_args=self.flags + [
+                    '--lua-filter', self.batch_filter,
+                    '--metadata', 'peppermynt-batch={0}'.format(f.name),
+                    '--metadata', 'peppermynt-format={0}'.format(self.format),
+                    '--metadata', 'peppermynt-separator={0}'.format(separator),
+                ] + list(chain.from_iterable(['--metadata', 'peppermynt-filters={0}'.format(name)] for name in self.filters)),
+                format='markdown'
+            )
+        finally:
+            remove(f.name)
+
+        fragments = html.rstrip('\n').split(separator)
+
+        if len(fragments) != len(markdowns):
+            raise ParserException('Batch conversion failed.',
+                'expected {0} documents, pandoc returned {1}'.format(len(markdowns), len(fragments)))
+
+        return [fragment + '\n' for fragment in fragments]
+
     def parse(self, markdown):
+        import pypandoc
+
         return pypandoc.convert_text(
             markdown, 'html',
             extra_args=self.flags,
-            format='markdown+smart+raw_tex+yaml_metadata_block-pipe_tables+grid_tables',
-            filters=['pandoc-sidenote']
+            format=self.format,
+            filters=self.filters
         )
 
+    def _check_batch(self):
+        import pypandoc
+
+        version = pypandoc.get_pandoc_version()
+
+        # the batch filter needs pandoc.read, run_json_filter and walk from pandoc 2.17's Lua API
+        if tuple(int(part) for part in re.findall(r'\d+', version)[:2]) < (2, 17):
+            raise ParserException('Batch conversion requires pandoc 2.17 or newer.',
+                'found pandoc {0}'.format(version),
+                'set batch to false in the tufte options to convert posts one at a time')
+
+    def parse_batch(self, markdowns):
+        if not self.options.get('batch', False):
+            return super(Parser, self).parse_batch(markdowns)
+
+        self._check_batch()
+
+        size = self.options.get('batch_size', 100)
+        html = []
+
+        for i in range(0, len(markdowns), size):
+            html.extend(self._parse_batch(markdowns[i:i + size]))
+
+        return html
+
+    def version(self):
+        import pypandoc
+
+        version = '{0} {1}'.format(pypandoc.get_pandoc_version(), ' '.join(self.flags + self.filters))
+
+        # batched output also depends on the batch filter, so a fix to it invalidates cached posts
+        if self.options.get('batch', False):
+            with open(self.batch_filter, 'rb') as f:
+                version += ' batch {0}'.format(sha1(f.read()).hexdigest()[:12])
+
+        return version
+
     def setup(self):
         self.css_styles = [
             'tufte-css/tufte.css',
@@ -29,3 +105,5 @@ class Parser(_Parser):
             '--section-divs',
             '--highlight-style=pygments',
         ] + list(chain.from_iterable(['--css', css_style] for css_style in self.css_styles))
+
+        self.batch_filter = op.join(op.dirname(op.abspath(__file__)), 'batch.lua')
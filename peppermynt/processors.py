@@ -3,31 +3,40 @@
 from calendar import timegm
 from collections import defaultdict
 from datetime import datetime
-from importlib import import_module
+from importlib import import_module, metadata
 from os import path as op
+from sys import intern
+import json
 import re
 
-from pkg_resources import DistributionNotFound, iter_entry_points, load_entry_point
-from pygments import highlight
-from pygments.formatters import HtmlFormatter
-from pygments.lexers import get_lexer_by_name
-from pygments.util import ClassNotFound
-
+from peppermynt.cache import Cache, Index
 from peppermynt.containers import Config, Container, Item, Items, Posts, SiteContent, Page
 from peppermynt.exceptions import ConfigException, ContentException, ParserException, RendererException
-from peppermynt.fs import File
-from peppermynt.utils import get_logger, dest_path, Timer, unescape, Url
+from peppermynt.fs import Body, Directory, File
+from peppermynt.trace import tracer
+from peppermynt.utils import get_logger, dest_path, normpath, unescape, Url
 
 
 logger = get_logger('peppermynt')
 
 
+def _entry_points(group):
+    points = metadata.entry_points()
+
+    # before Python 3.10, entry points came grouped in a dict
+    if hasattr(points, 'select'):
+        return points.select(group = group)
+
+    return points.get(group, ())
+
+
 class Reader:
     def __init__(self, src, temp, dest, site, writer):
         self._writer = writer
 
+        self._points = {}
         self._parsers = {}
-        self._extensions = defaultdict(list)
+        self._extensions = None
         self._cache = {}
 
         self.src = src
@@ -35,26 +44,62 @@ class Reader:
         self.dest = dest
         self.site = site
 
+        if site['parse_cache_size']:
+            self._parsed = Cache(Directory(normpath(temp.path, 'parsed')), site['parse_cache_size'] * 1024 * 1024)
+            self._contents = Cache(Directory(normpath(temp.path, 'content')), site['parse_cache_size'] * 1024 * 1024)
+        else:
+            self._parsed, self._contents = None, None
+
+        self._index = Index(
+            normpath(temp.path, 'index', '{0}.pickle'.format(Cache.key(src.path, dest.path))),
+            Cache.key(json.dumps(site, sort_keys = True, default = str))
+        )
+
         self._find_parsers()
 
     def _find_parsers(self):
-        for parser in iter_entry_points('peppermynt.parsers'):
-            name = parser.name
+        self._points = {parser.name: parser for parser in _entry_points('peppermynt.parsers')}
 
+    def _load_parser(self, name):
+        if name not in self._parsers:
             try:
-                Parser = parser.load()
-            except DistributionNotFound as e:
+                if name in self._points:
+                    self._parsers[name] = self._points[name].load()
+                else:
+                    self._parsers[name] = import_module('peppermynt.parsers.{0}'.format(name)).Parser
+            except ImportError as e:
                 logger.debug('@@ The %s parser could not be loaded due to a missing requirement: %s.', name, str(e))
 
-                continue
+                self._parsers[name] = None
 
-            for extension in Parser.accepts:
-                if 'parsers' in self.site and self.site['parsers'].get(extension.lstrip('.')) == name:
-                    self._extensions[extension].insert(0, name)
-                else:
-                    self._extensions[extension].append(name)
+        return self._parsers[name]
+
+    def _accepting(self, extension):
+        """Returns the names of the parsers that accept `extension`, preferred first.
+
+        The parser the `parsers` setting names for the extension is preferred
+        if it accepts it, and then it's the only parser loaded. Otherwise every
+        plugin is loaded to see which accept the extension.
+        """
+        configured = (self.site.get('parsers') or {}).get(extension.lstrip('.'))
+
+        if configured:
+            Parser = self._load_parser(configured)
 
-            self._parsers[name] = Parser
+            if Parser is not None and extension in Parser.accepts:
+                return [configured]
+
+        if self._extensions is None:
+            self._extensions = defaultdict(list)
+
+            for name in self._points:
+                Parser = self._load_parser(name)
+
+                if Parser is not None:
+                    for accepted in Parser.accepts:
+                        self._extensions[accepted].append(name)
+
+        return self._extensions.get(extension, [])
 
     def _get_date(self, mtime, date):
         if not date:
@@ -75,8 +120,8 @@ class Reader:
     def _get_parser(self, item, parser = None):
         if not parser:
             try:
-                parser = self._extensions[item.extension()][0]
-            except KeyError:
+                parser = self._accepting(item.extension())[0]
+            except IndexError:
                 raise ParserException('No parser found that accepts \'{0}\' files.'.format(item.extension()),
                     'src: {0}'.format(item))
 
@@ -85,13 +130,10 @@ class Reader:
 
         options = self.site.get(parser, None)
 
-        if parser in self._parsers:
-            Parser = self._parsers[parser](options)
-        else:
-            try:
-                Parser = import_module('peppermynt.parsers.{0}'.format(parser)).Parser(options)
-            except ImportError:
-                raise ParserException('The {0} parser could not be found.'.format(parser))
+        if self._load_parser(parser) is None:
+            raise ParserException('The {0} parser could not be found.'.format(parser))
+
+        Parser = self._parsers[parser](options)
 
         self._cache[parser] = Parser
 
@@ -111,10 +153,34 @@ class Reader:
 
         return container
 
+    @staticmethod
+    def _intern(fields):
+        # most items share their layout, date and tags with others, so keep one copy of each,
+        # which pickling the index then preserves
+        for key in ('date', 'layout'):
+            if isinstance(fields.get(key), str):
+                fields[key] = intern(fields[key])
+
+        tags = fields.get('tags')
+
+        if isinstance(tags, list):
+            for i, tag in enumerate(tags):
+                if isinstance(tag, str):
+                    tags[i] = intern(tag)
+
     def _init_item(self, config, f, simple = False):
-        Timer.start()
+        cached = self._index.get(f.path)
+
+        if cached is not None:
+            fields, offset = cached
+            self._intern(fields)
+            item = Item(f.path, fields)
+            item['raw_content'] = Body(f.path, offset)
 
-        frontmatter, bodymatter = self._parse_item_frontmatter(f)
+            return item
+
+        with tracer.span('frontmatter', 'frontmatter', item = f.path):
+            frontmatter, body = self._parse_item_frontmatter(f)
 
         item = Item(f.path)
 
@@ -130,30 +196,142 @@ class Reader:
         item['dest'] = dest_path(self.dest.path, item['url'])
 
         item.update(frontmatter)
-        item['raw_content'] = bodymatter
+        self._intern(item)
+
+        self._index.set(f.path, (dict(item), body.offset))
+
+        item['raw_content'] = body
 
         return item
 
+    @staticmethod
+    def _parser_signature(parser):
+        version = '{0}.{1} {2}'.format(type(parser).__module__, type(parser).__name__, parser.version())
+        options = json.dumps(parser.options, sort_keys = True, default = str)
+
+        return version, options
+
+    def _parse(self, parser, bodymatters):
+        if self._parsed is None:
+            keys = [None] * len(bodymatters)
+            contents = [None] * len(bodymatters)
+        else:
+            keys = [Cache.key(*self._parser_signature(parser), bodymatter) for bodymatter in bodymatters]
+            contents = [self._parsed.get(key) for key in keys]
+
+        misses = [i for i, content in enumerate(contents) if content is None]
+
+        with tracer.span('convert', 'parse', parser = type(parser).__module__, items = len(misses)):
+            if len(misses) == 1:
+                contents[misses[0]] = parser.parse(bodymatters[misses[0]])
+            elif misses:
+                for i, content in zip(misses, parser.parse_batch([bodymatters[i] for i in misses])):
+                    contents[i] = content
+
+        if self._parsed is not None:
+            for i in misses:
+                self._parsed.set(keys[i], contents[i])
+
+        return contents
+
+    def _content_key(self, bodymatter, parser, simple):
+        # keyed on the templated body rather than the source file, since a
+        # body using template syntax changes along with the data it uses
+        if self._contents is None:
+            return None
+
+        # the content is captured after highlighting
+        highlighting = self._writer.highlight_signature() if self.site['pygmentize'] else None
+
+        return Cache.key(self._index.signature, *self._parser_signature(parser), highlighting, simple, bodymatter)
+
+    def _restore_content(self, item, key):
+        """Sets the item's content from the one captured when it was last parsed."""
+        if key is None:
+            return False
+
+        captured = self._contents.get(key)
+
+        if captured is None:
+            return False
+
+        item.update(json.loads(captured))
+
+        return True
+
+    def _set_content(self, item, content, simple = False, key = None):
+        if self.site['pygmentize']:
+            content = self._writer.pygmentize(content)
+
+        captured = {'content': content}
+
+        if not simple:
+            captured['excerpt'] = re.search(r'\A.*?(?:<p>(.+?)</p>)?', content, re.M | re.S).group(1)
+
+        item.update(captured)
+
+        if key is not None:
+            self._contents.set(key, json.dumps(captured))
+
+    def _from_string(self, item):
+        with tracer.span('body', 'jinja', item = str(item)):
+            return self._writer.from_string(item.pop('raw_content').read(), item)
+
     def parse_item(self, config, item, simple = False):
-        bodymatter = item.pop('raw_content')
+        if 'raw_content' not in item:
+            return item
+
         parser = self._get_parser(item, item.get('parser', config.get('parser', None)))
-        content = parser.parse(self._writer.from_string(bodymatter, item))
-        item['content'] = content
-        if not simple:
-            item['excerpt'] = re.search(r'\A.*?(?:<p>(.+?)</p>)?', content, re.M | re.S).group(1)
+        bodymatter = self._from_string(item)
+        key = self._content_key(bodymatter, parser, simple)
 
-        logger.debug('..  (%.3fs) %s', Timer.stop(), str(item).replace(self.src.path, ''))
+        if self._restore_content(item, key):
+            return item
+
+        with tracer.span('parse', 'parse', item = str(item)) as span:
+            self._set_content(item, self._parse(parser, [bodymatter])[0], simple, key)
+
+        logger.debug('..  (%.3fs) %s', span.duration, str(item).replace(self.src.path, ''))
 
         return item
 
+    def parse_items(self, config, items, simple = False):
+        batches = defaultdict(list)
+
+        for item in items:
+            if 'raw_content' in item:
+                parser = self._get_parser(item, item.get('parser', config.get('parser', None)))
+                bodymatter = self._from_string(item)
+                key = self._content_key(bodymatter, parser, simple)
+
+                if not self._restore_content(item, key):
+                    batches[parser].append((item, bodymatter, key))
+
+        for parser, batch in batches.items():
+            with tracer.span('parse', 'parse', items = len(batch)) as span:
+                contents = self._parse(parser, [bodymatter for _, bodymatter, _ in batch])
+
+                for (item, _, key), content in zip(batch, contents):
+                    self._set_content(item, content, simple, key)
+
+            logger.debug('..  (%.3fs) parsed %d items', span.duration, len(batch))
+
+        if self._parsed is not None:
+            logger.debug('..  content cache: %d hits, %d misses', self._contents.hits, self._contents.misses)
+            logger.debug('..  parse cache: %d hits, %d misses, %d bytes', self._parsed.hits, self._parsed.misses, self._parsed.size)
+
+        return items
+
     def _parse_item_frontmatter(self, f):
-        try:
-            frontmatter, bodymatter = re.search(r'\A---\s+^(.+?)$\s+---\s*(.*)\Z', f.content, re.M | re.S).groups()
-            frontmatter = Config(frontmatter)
-        except AttributeError:
+        frontmatter, body = f.frontmatter()
+
+        if frontmatter is None:
             raise ContentException('Invalid frontmatter.',
                 'src: {0}'.format(f.path),
                 'frontmatter must not be empty')
+
+        try:
+            frontmatter = Config(frontmatter)
         except ConfigException:
             raise ConfigException('Invalid frontmatter.',
                 'src: {0}'.format(f.path),
@@ -166,7 +344,7 @@ class Reader:
 
         frontmatter.pop('url', None)
 
-        return frontmatter, bodymatter
+        return frontmatter, body
 
     def init_parse(self):
         posts = self._init_container(Posts(self.src, self.site))
@@ -182,7 +360,7 @@ class Reader:
             pages.extend(container.pages)
 
         for f in miscellany.path:
-            if f.extension in self._extensions:
+            if self._accepting(f.extension):
                 miscellany.add(self._init_item(miscellany.config, f, True))
             elif f.extension == '.xml':
                 # Assume for now that the only xml files are feeds
@@ -192,6 +370,12 @@ class Reader:
 
         pages.extend(miscellany.pages)
 
+        logger.debug('..  frontmatter index: %d hits, %d misses', self._index.hits, self._index.misses)
+
+        # the items now hold everything they need from the index
+        self._index.save()
+        self._index.release()
+
         return SiteContent(posts, containers, pages, feeds)
 
 
@@ -204,40 +388,105 @@ class Writer:
 
         self._renderer = self._get_renderer()
 
+        self._formatter = None
+        self._lexers = {}
+
+        if site['parse_cache_size']:
+            self._highlighted = Cache(Directory(normpath(temp.path, 'highlighted')), site['parse_cache_size'] * 1024 * 1024)
+        else:
+            self._highlighted = None
+
     def _get_renderer(self):
         renderer = self.site['renderer']
         options = self.site.get(renderer, None)
 
-        try:
-            Renderer = load_entry_point('peppermynt', 'peppermynt.renderers', renderer)
-        except DistributionNotFound as e:
-            raise RendererException('The {0} renderer requires {1}.'.format(renderer, str(e)))
-        except ImportError:
+        for point in _entry_points('peppermynt.renderers'):
+            if point.name == renderer:
+                try:
+                    Renderer = point.load()
+                except ImportError as e:
+                    raise RendererException('The {0} renderer requires {1}.'.format(renderer, e.name or str(e)))
+
+                break
+        else:
             try:
                 Renderer = import_module('peppermynt.renderers.{0}'.format(renderer)).Renderer
             except ImportError:
                 raise RendererException('The {0} renderer could not be found.'.format(renderer))
 
-        return Renderer(self.src.path, options)
+        # compiled templates are kept along with the other caches
+        cache = normpath(self.temp.path, 'templates') if self.site['parse_cache_size'] else None
+
+        return Renderer(self.src.path, options, cache = cache, cache_size = self.site['parse_cache_size'] * 1024 * 1024)
+
+    def _get_formatter(self):
+        if self._formatter is None:
+            from pygments.formatters import HtmlFormatter
+
+            self._formatter = HtmlFormatter(linenos = 'table')
+
+        return self._formatter
+
+    def _get_lexer(self, language):
+        from pygments.lexers import get_lexer_by_name
+        from pygments.util import ClassNotFound
+
+        if language not in self._lexers:
+            try:
+                self._lexers[language] = get_lexer_by_name(language)
+            except ClassNotFound:
+                self._lexers[language] = get_lexer_by_name('text')
+
+        return self._lexers[language]
 
     def _highlight(self, match):
+        from pygments import highlight
+
         language, code = match.groups()
-        formatter = HtmlFormatter(linenos = 'table')
-        code = unescape(code)
 
-        try:
-            code = highlight(code, get_lexer_by_name(language), formatter)
-        except ClassNotFound:
-            code = highlight(code, get_lexer_by_name('text'), formatter)
+        if self._highlighted is not None:
+            key = Cache.key(*self.highlight_signature(), language, code)
+            html = self._highlighted.get(key)
+
+            if html is not None:
+                return html
+
+        code = highlight(unescape(code), self._get_lexer(language), self._get_formatter())
+        html = '<div class="code"><div>{0}</div></div>'.format(code)
+
+        if self._highlighted is not None:
+            self._highlighted.set(key, html)
+
+        return html
+
+    def highlight_signature(self):
+        """Returns what highlighted code depends on besides the code itself."""
+        from pygments import __version__ as pygments_version
 
-        return '<div class="code"><div>{0}</div></div>'.format(code)
+        return pygments_version, sorted(self._get_formatter().options.items())
 
-    def _pygmentize(self, html):
-        return re.sub(r'<pre><code[^>]+data-lang="([^>]+)"[^>]*>(.+?)</code></pre>', self._highlight, html, flags = re.S)
+    def pygmentize(self, html):
+        if 'data-lang=' not in html:
+            return html
+
+        with tracer.span('highlight', 'highlight'):
+            return re.sub(r'<pre><code[^>]+data-lang="([^>]+)"[^>]*>(.+?)</code></pre>', self._highlight, html, flags = re.S)
+
+    def dependencies(self, template):
+        return self._renderer.dependencies(template)
 
     def from_string(self, string, data = None):
         return self._renderer.from_string(string, data)
 
+    def invalidate(self):
+        self._renderer.invalidate()
+
+    def precompile(self):
+        with tracer.span('precompile', 'jinja') as span:
+            count = self._renderer.precompile()
+
+        logger.debug('..  (%.3fs) precompiled %d templates', span.duration, count)
+
     def register(self, data):
         self._renderer.register(data)
 
@@ -248,14 +497,15 @@ class Writer:
         path = self.render_path(template, data, url)
 
         try:
-            Timer.start()
-
-            content = self._renderer.render(template, data)
+            with tracer.span('render', 'render', page = url or template, template = template) as span:
+                content = self._renderer.render(template, data)
 
-            if self.site['pygmentize']:
-                content = self._pygmentize(content)
+                # item content is highlighted when it's parsed, so this only
+                # finds code blocks in the templates themselves
+                if self.site['pygmentize']:
+                    content = self.pygmentize(content)
 
-            logger.debug('..  (%.3fs) %s', Timer.stop(), path.replace(self.dest.path, ''))
+            logger.debug('..  (%.3fs) %s', span.duration, path.replace(self.dest.path, ''))
         except RendererException as e:
             raise RendererException(
                 e.message,
@@ -2,16 +2,20 @@
 
 from collections import OrderedDict
 from datetime import datetime
+from hashlib import sha1
 import gettext
 import locale
-from os import path as op
+from os import makedirs, path as op, walk
 from re import sub
 
-from jinja2 import Environment, FileSystemLoader, PrefixLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, PrefixLoader, meta, pass_context
 from jinja2.exceptions import TemplateNotFound
+from jinja2.lexer import newline_re
 
 from peppermynt.base import Renderer as _Renderer
+from peppermynt.cache import Cache
 from peppermynt.exceptions import RendererException
+from peppermynt.fs import Directory
 from peppermynt.utils import normpath, Url
 
 
@@ -40,12 +44,26 @@ class Renderer(_Renderer):
     config = {}
 
     def _absolutize(self, html):
-        def _replace(match):
-            return self._get_url(match.group(1).replace(self.globals['site']['base_url'], '', 1), True)
+        site = self.globals['site']
+        key = Cache.key(site['base_url'], site['domain'], html) if self._absolutized is not None else None
+        absolutized = self._absolutized.get(key) if key is not None else None
 
-        return sub(r'(?<==")({0}[^"]*)'.format(self.globals['site']['base_url']), _replace, html)
+        if absolutized is None:
+            def _replace(match):
+                return self._get_url(match.group(1).replace(site['base_url'], '', 1), True)
 
-    def _date(self, ts, format = '%A, %B %d, %Y'):
+            absolutized = sub(r'(?<==")({0}[^"]*)'.format(site['base_url']), _replace, html)
+
+            # feeds absolutize the same post content in every build
+            if key is not None:
+                self._absolutized.set(key, absolutized)
+
+        return absolutized
+
+    # taking the context keeps jinja from folding `none|date` into a
+    # constant, which the bytecode cache would keep across builds
+    @pass_context
+    def _date(self, context, ts, format = '%A, %B %d, %Y'):
         if ts is None:
             return datetime.utcnow().strftime(format)
 
@@ -72,14 +90,90 @@ class Renderer(_Renderer):
     def _values(self, dict_):
         return dict_.values()
 
+    def _templates(self):
+        for root, _dirs, files in walk(normpath(self.path, '_templates')):
+            for f in files:
+                yield normpath(root, f)
+
+    def dependencies(self, template):
+        if template in self._dependencies:
+            # None marks a template whose dependencies are being collected,
+            # i.e. one that includes itself
+            return self._dependencies[template] or []
+
+        self._dependencies[template] = None
+
+        try:
+            source, filename, _ = self.environment.loader.get_source(self.environment, template)
+        except TemplateNotFound:
+            self._dependencies[template] = []
+
+            return []
+
+        paths = {filename}
+
+        for name in meta.find_referenced_templates(self.environment.parse(source)):
+            if name is None:
+                # the name is computed at render time, so it could be any template
+                paths.update(self._templates())
+            else:
+                paths.update(self.dependencies(name))
+
+        self._dependencies[template] = sorted(paths)
+
+        return self._dependencies[template]
+
+    def _plain(self, string):
+        # what jinja would render from a string without any template syntax,
+        # normalizing its newlines the same way
+        lines = newline_re.split(string)[::2]
+
+        if not self.environment.keep_trailing_newline and lines[-1] == '':
+            del lines[-1]
+
+        return self.environment.newline_sequence.join(lines)
+
     def from_string(self, string, data = None):
+        if not any(marker in string for marker in self._markers):
+            return self._plain(string)
+
         if data is None:
             data = {}
 
-        template = self.environment.from_string(string)
+        key = sha1(string.encode('utf-8')).digest()
+        template = self._compiled.get(key)
+
+        # templates see the environment's globals through a ChainMap since
+        # Jinja 3.0, so a cached template picks up what register() changes
+        if template is None:
+            if len(self._compiled) >= 1024:
+                self._compiled.popitem(last = False)
+
+            template = self._compiled[key] = self.environment.from_string(string)
+        else:
+            self._compiled.move_to_end(key)
 
         return template.render(**data)
 
+    def invalidate(self):
+        self._dependencies.clear()
+
+    def precompile(self):
+        """Compiles every template in _templates, so their bytecode is cached."""
+        templates = normpath(self.path, '_templates')
+        count = 0
+
+        for path in self._templates():
+            name = op.relpath(path, templates).replace(op.sep, '/')
+
+            if op.basename(name).startswith('.'):
+                continue
+
+            self.environment.get_template(name)
+            count += 1
+
+        return count
+
     def register(self, data):
         self.globals.update(data)
         self.environment.globals.update(data)
@@ -96,20 +190,48 @@ class Renderer(_Renderer):
         return template.render(**data)
 
     def setup(self):
+        self._compiled = OrderedDict()
+        self._dependencies = {}
+
         self.config.update(self.options)
         self.config['loader'] = _PrefixLoader(OrderedDict([
             (op.sep, FileSystemLoader(self.path)),
             ('', FileSystemLoader(normpath(self.path, '_templates')))
         ]), None)
 
+        if self.cache is not None and self.cache_size:
+            self._absolutized = Cache(Directory(normpath(self.cache, 'absolutized')), self.cache_size)
+        else:
+            self._absolutized = None
+
         self.environment = Environment(**self.config)
 
+        self._markers = [marker for marker in (
+            self.environment.block_start_string,
+            self.environment.variable_start_string,
+            self.environment.comment_start_string,
+            self.environment.line_statement_prefix,
+            self.environment.line_comment_prefix
+        ) if marker]
+
         self.environment.filters['absolutize'] = self._absolutize
         self.environment.filters['date'] = self._date
         self.environment.filters['items'] = self._items
         self.environment.filters['values'] = self._values
         self.environment.filters['slugify'] = Url.slugify
 
+        if self.cache is not None:
+            # jinja checks a template's source against its cached bytecode, so
+            # edited templates are recompiled, but not how the filters are
+            # called, which is compiled in too
+            signature = sha1(repr((
+                sorted((name, getattr(f, 'jinja_pass_arg', None)) for name, f in self.environment.filters.items()),
+                sorted(self.environment.extensions)
+            )).encode('utf-8')).hexdigest()[:12]
+
+            makedirs(self.cache, exist_ok = True)
+            self.environment.bytecode_cache = FileSystemBytecodeCache(self.cache, '__jinja2_{0}_%s.cache'.format(signature))
+
         self.environment.globals.update(self.globals)
         self.environment.globals['get_asset'] = self._get_asset
         self.environment.globals['get_url'] = self._get_url
@@ -1,7 +1,15 @@
 # -*- coding: utf-8 -*-
 
+from collections import OrderedDict
+from datetime import timezone
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
 from http.server import SimpleHTTPRequestHandler
-from socketserver import TCPServer
+from io import BytesIO
+from os import fstat, path as op
+from socketserver import ThreadingMixIn, TCPServer
+from threading import Lock
+from urllib.parse import urlsplit
 
 from peppermynt.utils import get_logger
 
@@ -9,7 +17,59 @@ from peppermynt.utils import get_logger
 logger = get_logger('peppermynt')
 
 
+class FileCache:
+    """An in-memory LRU of small files, keyed by path and validated by stat.
+
+    Files larger than `max_file` bytes are never cached; they're sent
+    straight from disk instead.
+    """
+    def __init__(self, limit, max_file):
+        self.limit = limit
+        self.max_file = max_file
+
+        self.size = 0
+
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, path, stat):
+        with self._lock:
+            entry = self._entries.get(path)
+
+            if entry is None:
+                return None
+
+            if entry[0] != (stat.st_mtime_ns, stat.st_size):
+                self.size -= len(self._entries.pop(path)[1])
+
+                return None
+
+            self._entries.move_to_end(path)
+
+            return entry[1]
+
+    def set(self, path, stat, data):
+        if len(data) > self.max_file or len(data) > self.limit:
+            return
+
+        with self._lock:
+            old = self._entries.pop(path, None)
+
+            if old is not None:
+                self.size -= len(old[1])
+
+            self._entries[path] = ((stat.st_mtime_ns, stat.st_size), data)
+            self.size += len(data)
+
+            while self.size > self.limit:
+                _, (_, evicted) = self._entries.popitem(last = False)
+                self.size -= len(evicted)
+
+
 class RequestHandler(SimpleHTTPRequestHandler):
+    # keep connections open between requests; every response sets Content-Length
+    protocol_version = 'HTTP/1.1'
+
     # SimpleHTTPRequestHandler serves some stuff with the wrong MIME type
     extensions_map = {
         '': 'application/octet-stream',
@@ -29,21 +89,148 @@ class RequestHandler(SimpleHTTPRequestHandler):
     def __init__(self, request, client_address, base_url, server):
         self.base_url = base_url
 
-        SimpleHTTPRequestHandler.__init__(self, request, client_address, server)
+        SimpleHTTPRequestHandler.__init__(self, request, client_address, server, directory = server.directory)
+
+    def _accepts_gzip(self):
+        encodings = self.headers.get('Accept-Encoding', '')
+
+        return any(e.split(';')[0].strip() == 'gzip' for e in encodings.split(','))
+
+    def _not_modified(self, etag, mtime):
+        if 'If-None-Match' in self.headers:
+            tags = [t.strip() for t in self.headers['If-None-Match'].split(',')]
+
+            # a weak comparison, as If-None-Match calls for
+            return '*' in tags or etag in tags or 'W/' + etag in tags
+
+        if 'If-Modified-Since' in self.headers:
+            try:
+                since = parsedate_to_datetime(self.headers['If-Modified-Since'])
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+
+            if since.tzinfo is None:
+                since = since.replace(tzinfo = timezone.utc)
+
+            return int(mtime) <= since.timestamp()
+
+        return False
+
+    def copyfile(self, source, outputfile):
+        if isinstance(source, BytesIO):
+            outputfile.write(source.getbuffer())
+        else:
+            # uses sendfile(2) where the platform supports it
+            self.connection.sendfile(source)
 
     def do_GET(self):
         self.path = self.path.replace(self.base_url, '/')
 
         SimpleHTTPRequestHandler.do_GET(self)
 
+    def do_HEAD(self):
+        self.path = self.path.replace(self.base_url, '/')
+
+        SimpleHTTPRequestHandler.do_HEAD(self)
 
-class Server(TCPServer):
+    def send_head(self):
+        path = self.translate_path(self.path)
+
+        if op.isdir(path):
+            index = op.join(path, 'index.html')
+
+            # redirects and directory listings are left to SimpleHTTPRequestHandler
+            if not urlsplit(self.path).path.endswith('/') or not op.isfile(index):
+                return SimpleHTTPRequestHandler.send_head(self)
+
+            path = index
+
+        if path.endswith('/'):
+            self.send_error(HTTPStatus.NOT_FOUND, 'File not found')
+
+            return None
+
+        content_type = self.guess_type(path)
+        encoding = None
+
+        if self._accepts_gzip() and op.isfile(path + '.gz'):
+            try:
+                stale = op.getmtime(path + '.gz') < op.getmtime(path)
+            except OSError:
+                stale = True
+
+            if not stale:
+                path, encoding = path + '.gz', 'gzip'
+
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, 'File not found')
+
+            return None
+
+        try:
+            stat = fstat(f.fileno())
+            etag = '"{0:x}-{1:x}{2}"'.format(stat.st_mtime_ns, stat.st_size, '-gz' if encoding else '')
+
+            if self._not_modified(etag, stat.st_mtime):
+                f.close()
+
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', formatdate(stat.st_mtime, usegmt = True))
+                self.send_header('Vary', 'Accept-Encoding')
+                self.end_headers()
+
+                return None
+
+            source = f
+
+            if stat.st_size <= self.server.files.max_file:
+                data = self.server.files.get(path, stat)
+
+                if data is None:
+                    data = f.read()
+
+                    self.server.files.set(path, stat, data)
+
+                f.close()
+
+                source = BytesIO(data)
+
+            self.send_response(HTTPStatus.OK)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(stat.st_size))
+            self.send_header('Last-Modified', formatdate(stat.st_mtime, usegmt = True))
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept-Encoding')
+
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+
+            self.end_headers()
+
+            return source
+        except:
+            f.close()
+
+            raise
+
+
+class Server(ThreadingMixIn, TCPServer):
     allow_reuse_address = True
+    daemon_threads = True
 
-    def __init__(self, server_address, base_url, RequestHandlerClass, bind_and_activate = True):
+    def __init__(self, server_address, base_url, RequestHandlerClass, directory = '.', cache_size = 64 * 1024 ** 2,
+            bind_and_activate = True):
         TCPServer.__init__(self, server_address, RequestHandlerClass, bind_and_activate)
 
         self.base_url = base_url
+        self.directory = directory
+
+        # files bigger than this go out with sendfile rather than through the cache
+        self.files = FileCache(cache_size, 256 * 1024)
 
     def finish_request(self, request, client_address):
         self.RequestHandlerClass(request, client_address, self.base_url, self)
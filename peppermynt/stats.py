@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+from threading import Lock
+
+
+class Stats:
+    """Counts what a build did to the destination.
+
+    Counts are kept in shared memory once `start` has been called, so the
+    worker processes doit forks for a parallel build add to the same counts
+    as the process that reports them. Until then, or in a process that never
+    calls it, they are kept in the process itself.
+    """
+    names = ('written', 'unchanged')
+
+    def __init__(self):
+        self._lock = Lock()
+        self._shared = None
+        self._local = [0] * len(self.names)
+
+    def start(self):
+        """Zeroes the counts, moving them into shared memory the first time."""
+        if self._shared is None:
+            from multiprocessing import Array
+
+            self._shared = Array('q', len(self.names))
+
+        with self._shared.get_lock():
+            self._shared[:] = [0] * len(self.names)
+
+    def add(self, name, n = 1):
+        i = self.names.index(name)
+
+        if self._shared is None:
+            with self._lock:
+                self._local[i] += n
+        else:
+            with self._shared.get_lock():
+                self._shared[i] += n
+
+    def get(self, name):
+        i = self.names.index(name)
+
+        return self._local[i] if self._shared is None else self._shared[i]
+
+
+stats = Stats()
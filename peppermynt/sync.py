@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+
+from concurrent.futures import ThreadPoolExecutor
+from errno import EXDEV
+from filecmp import cmp
+from os import link, makedirs, path as op, remove, rmdir, scandir, stat
+import os
+import shutil
+
+try:
+    from fcntl import ioctl
+except ImportError:
+    ioctl = None
+
+from peppermynt.cache import Cache, Index
+from peppermynt.compress import SIDECARS
+from peppermynt.fs import atomic
+from peppermynt.stats import stats
+from peppermynt.trace import tracer
+from peppermynt.utils import get_logger
+
+
+logger = get_logger('peppermynt')
+
+
+# from linux/fs.h
+FICLONE = 0x40049409
+
+
+def _ignored(name):
+    return name.startswith(('.', '_'))
+
+
+class Sync:
+    """Mirrors source files and directories into the destination.
+
+    Sources are described by (src, dest) pairs; directories are copied
+    recursively, skipping names that start with `.` or `_`. What was copied
+    is recorded in an Index keyed by each source's mtime and size, so a sync
+    only stats the unchanged files, copies new and modified ones and removes
+    the outputs of sources that no longer exist.
+
+    Files are copied in a thread pool, by reflink where the filesystem
+    supports it, then by copy_file_range, then by an ordinary copy. With
+    `hardlink`, outputs are hard links to their sources instead, which is
+    fastest but means editing an output edits its source. A stale output
+    that turns out to match its source already is left alone, keeping its
+    mtime.
+    """
+    def __init__(self, root, pairs, manifest, hardlink = False, workers = None):
+        self.root = root
+        self.pairs = pairs
+        self.hardlink = hardlink
+        self.workers = workers
+
+        self.copied, self.unchanged, self.removed = 0, 0, 0
+
+        self._index = Index(manifest, Cache.key(*sorted(pairs), hardlink))
+        self._reflink = ioctl is not None
+        self._copy_range = hasattr(os, 'copy_file_range')
+
+    def _sources(self):
+        for src, dest in self.pairs:
+            if op.isdir(src):
+                yield from self._walk(src, dest)
+            elif op.isfile(src):
+                yield src, dest, stat(src)
+
+    def _walk(self, src, dest):
+        for entry in scandir(src):
+            if _ignored(entry.name):
+                continue
+
+            if entry.is_dir():
+                yield from self._walk(entry.path, op.join(dest, entry.name))
+            elif entry.is_file():
+                yield entry.path, op.join(dest, entry.name), entry.stat()
+
+    def _stale(self, src, dest, s):
+        entry = self._index.get(src, s)
+
+        if entry is None or entry[0] != dest:
+            return True
+
+        try:
+            d = stat(dest)
+        except FileNotFoundError:
+            return True
+
+        return (d.st_mtime_ns, d.st_size) != entry[1:]
+
+    def _clone(self, fsrc, fdst):
+        if self._reflink:
+            try:
+                ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+                return True
+            except OSError:
+                self._reflink = False
+
+        if self._copy_range:
+            size = op.getsize(fsrc.name)
+
+            try:
+                while size > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size)
+
+                    if copied == 0:
+                        break
+
+                    size -= copied
+
+                return size == 0
+            except OSError:
+                self._copy_range = False
+
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+
+        return False
+
+    def _current(self, src, dest, s):
+        """Returns the stat of `dest` if it already matches `src`."""
+        try:
+            d = stat(dest)
+        except FileNotFoundError:
+            return None
+
+        linked = op.samestat(s, d)
+
+        # with links, only a link will do, and without them a link won't
+        if self.hardlink or linked:
+            return d if self.hardlink and linked else None
+
+        if d.st_size != s.st_size or not cmp(src, dest, shallow = False):
+            return None
+
+        return d
+
+    def _copy(self, job):
+        src, dest, s = job
+        d = self._current(src, dest, s)
+
+        if d is not None:
+            logger.debug('..  unchanged: %s', dest)
+
+            return src, (dest, d.st_mtime_ns, d.st_size), s, False
+
+        logger.debug('..  cp: %s\n..      dest: %s', src, dest)
+
+        with atomic(dest) as tmp:
+            linked = False
+
+            if self.hardlink:
+                try:
+                    link(src, tmp)
+                    linked = True
+                except OSError as e:
+                    if e.errno != EXDEV:
+                        raise
+
+            if not linked:
+                with open(src, 'rb') as fsrc, open(tmp, 'wb') as fdst:
+                    if not self._clone(fsrc, fdst):
+                        shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+
+        d = stat(dest)
+
+        return src, (dest, d.st_mtime_ns, d.st_size), s, True
+
+    def _remove(self, dest):
+        try:
+            remove(dest)
+        except FileNotFoundError:
+            return
+
+        logger.debug('..  rm: %s', dest)
+
+        self.removed += 1
+
+        # clean up directories left empty, short of the destination itself
+        parent = op.dirname(dest)
+
+        while parent.startswith(self.root + op.sep):
+            try:
+                rmdir(parent)
+            except OSError:
+                break
+
+            parent = op.dirname(parent)
+
+    def run(self):
+        jobs, dests = [], set()
+
+        for src, dest, s in self._sources():
+            dests.add(dest)
+
+            if self._stale(src, dest, s):
+                jobs.append((src, dest, s))
+
+        for directory in {op.dirname(dest) for _, dest, _ in jobs}:
+            makedirs(directory, exist_ok = True)
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            for src, entry, s, copied in pool.map(self._copy, jobs):
+                self._index.set(src, entry, s)
+
+                if copied:
+                    self.copied += 1
+                else:
+                    self.unchanged += 1
+
+        for src, entry in self._index.unseen().items():
+            if entry[0] not in dests:
+                self._remove(entry[0])
+
+        self._index.save()
+
+        logger.debug('..  synced %d files, copied %d, kept %d unchanged and removed %d',
+            len(dests), self.copied, self.unchanged, self.removed)
+
+
+def sync(root, pairs, manifest, hardlink = False):
+    with tracer.span('sync', 'assets'):
+        synced = Sync(root, pairs, manifest, hardlink)
+        synced.run()
+
+    stats.add('written', synced.copied)
+    stats.add('unchanged', synced.unchanged)
+
+    tracer.flush()
+
+
+def synced(pairs, manifest, hardlink = False):
+    """Returns the outputs recorded by the last sync of `pairs`."""
+    index = Index(manifest, Cache.key(*sorted(pairs), hardlink))
+
+    return {entry[0] for entry in index.unseen().values()}
+
+
+def _prune(root, directory, keep):
+    removed, empty = 0, True
+
+    for entry in scandir(directory):
+        if _ignored(entry.name):
+            empty = False
+        elif entry.is_dir(follow_symlinks = False):
+            count, emptied = _prune(root, entry.path, keep)
+            removed += count
+
+            if emptied:
+                logger.debug('..  rm: %s', entry.path)
+                rmdir(entry.path)
+            else:
+                empty = False
+        elif entry.path in keep or (entry.path.endswith(SIDECARS) and op.splitext(entry.path)[0] in keep):
+            empty = False
+        else:
+            logger.debug('..  rm: %s', entry.path)
+            remove(entry.path)
+            removed += 1
+
+    return removed, empty
+
+
+def prune(root, targets, pairs, manifest):
+    """Removes the outputs in `root` that no task of the build produced.
+
+    Outputs are the pages in `targets`, the files synced from `pairs` and
+    their compressed sidecars. Like emptying the destination, this skips
+    names that start with `.` or `_`. Unlike it, the outputs that were
+    rebuilt stay where they are, and keep their mtimes if unchanged.
+    """
+    with tracer.span('prune', 'assets'):
+        keep = set(targets)
+        keep.update(dest for _, dest, _ in Sync(root, pairs, manifest)._sources())
+
+        removed, _ = _prune(root, root, keep)
+
+    tracer.flush()
+
+    if removed:
+        logger.info('Removed %d outputs whose sources are gone', removed)
@@ -9,10 +9,11 @@ from doit.cmd_base import TaskLoader
 from doit.loader import generate_tasks
 from doit.reporter import ExecutedOnlyReporter, ConsoleReporter
 
+from .checker import StatChecker
 from .containers import Posts, Items
 from .exceptions import ConfigException, OptionException
-from .fs import Directory, EventHandler, File
-from .utils import get_logger, normpath, Timer, Url
+from .fs import Directory, File
+from .utils import get_logger, normpath, Url
 
 
 logger = get_logger('peppermynt')
@@ -36,14 +37,18 @@ def items(src, site):
 
 
 class PeppermyntTaskLoader(TaskLoader):
-    def __init__(self, peppermynt):
+    def __init__(self, peppermynt, tasks = None):
         super().__init__()
         self.peppermynt = peppermynt
+        self.tasks = tasks
 
     def load_tasks(self, cmd, opt_values, pos_args):
         doit_config = {
             'action_string_formatting': 'both',
+            'check_file_uptodate': StatChecker,
             'reporter': ExecutedOnlyReporter,
             'outfile': sys.stdout,
         }
-        return generate_tasks('render_site', self.peppermynt.generate_tasks()), doit_config
+        tasks = self.peppermynt.generate_tasks() if self.tasks is None else (task for task in self.tasks)
+
+        return generate_tasks('render_site', tasks), doit_config
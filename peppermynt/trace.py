@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+from collections import defaultdict
+from glob import iglob
+from os import getpid, register_at_fork, remove
+from threading import Lock, get_ident
+from time import perf_counter_ns
+import json
+
+from peppermynt.utils import get_logger
+
+
+logger = get_logger('peppermynt')
+
+
+class Span:
+    """A timed section of the build.
+
+    The duration is measured whether or not tracing is enabled, so spans can
+    stand in for ad hoc timers in log messages. It's only recorded as a trace
+    event when the tracer is enabled.
+    """
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start', 'duration')
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+        self.start, self.duration = None, 0.0
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+
+        return self
+
+    def __exit__(self, *exc):
+        end = perf_counter_ns()
+
+        self.duration = (end - self.start) / 1e9
+
+        if self.tracer.path is not None:
+            self.tracer.record(self, end)
+
+        return False
+
+
+class Tracer:
+    """Collects spans as Chrome trace events.
+
+    Each process buffers its own events and appends them to a part file next
+    to the trace with `flush`, so doit's worker processes don't have to send
+    anything back. Timestamps come from the monotonic clock, which all the
+    processes share, and each event carries its process and thread ids.
+    `finish` merges the parts into the trace once the build is over.
+    """
+    def __init__(self):
+        self.path = None
+
+        self._events = []
+        self._lock = Lock()
+
+        # a forked worker starts with none of its parent's events
+        register_at_fork(after_in_child = self._forked)
+
+    def _forked(self):
+        self._events = []
+        self._lock = Lock()
+
+    def _part(self):
+        return '{0}.{1}.part'.format(self.path, getpid())
+
+    def _parts(self):
+        return iglob('{0}.*.part'.format(self.path))
+
+    def enable(self, path):
+        self.path = path
+
+    def span(self, name, category, **args):
+        return Span(self, name, category, args)
+
+    def record(self, span, end):
+        event = {
+            'name': span.name,
+            'cat': span.category,
+            'ph': 'X',
+            'ts': span.start / 1000,
+            'dur': (end - span.start) / 1000,
+            'pid': getpid(),
+            'tid': get_ident(),
+        }
+
+        if span.args:
+            event['args'] = span.args
+
+        with self._lock:
+            self._events.append(event)
+
+    def flush(self):
+        if self.path is None:
+            return
+
+        with self._lock:
+            events, self._events = self._events, []
+
+        if events:
+            with open(self._part(), 'a', encoding = 'utf-8') as f:
+                for event in events:
+                    f.write(json.dumps(event, default = str) + '\n')
+
+    def reset(self):
+        """Discards the parts left behind by an earlier, interrupted build."""
+        if self.path is None:
+            return
+
+        for part in self._parts():
+            remove(part)
+
+    def finish(self):
+        """Merges the parts into the trace and returns its events."""
+        if self.path is None:
+            return []
+
+        self.flush()
+
+        events = []
+
+        for part in sorted(self._parts()):
+            with open(part, 'r', encoding = 'utf-8') as f:
+                events.extend(json.loads(line) for line in f)
+
+            remove(part)
+
+        events.sort(key = lambda event: event['ts'])
+
+        with open(self.path, 'w', encoding = 'utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+        logger.info('..  wrote %d trace events to %s', len(events), self.path)
+
+        return events
+
+
+def slowest(events, key, n = 10, category = 'render'):
+    """Totals the durations of the events in `category` by one of their args.
+
+    Returns the `n` largest totals as (seconds, count, value) tuples.
+    """
+    totals, counts = defaultdict(float), defaultdict(int)
+
+    for event in events:
+        if event['cat'] == category and key in event.get('args', {}):
+            totals[event['args'][key]] += event['dur'] / 1e6
+            counts[event['args'][key]] += 1
+
+    return sorted(((total, counts[value], value) for value, total in totals.items()), reverse = True)[:n]
+
+
+def summarize(events, n = 10):
+    if not events:
+        return
+
+    logger.info('>> Slowest pages')
+
+    for seconds, _, page in slowest(events, 'page', n):
+        logger.info('..  (%.3fs) %s', seconds, page)
+
+    logger.info('>> Slowest templates')
+
+    for seconds, count, template in slowest(events, 'template', n):
+        logger.info('..  (%.3fs, %d pages) %s', seconds, count, template)
+
+
+tracer = Tracer()
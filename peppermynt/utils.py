@@ -3,7 +3,6 @@
 import logging
 from os import path as op
 import re
-from time import time
 
 
 _ENTITIES = [
@@ -85,18 +84,6 @@ def dest_path(dest_root, url):
     return path
 
 
-class Timer(object):
-    _start = []
-
-    @classmethod
-    def start(cls):
-        cls._start.append(time())
-
-    @classmethod
-    def stop(cls):
-        return time() - cls._start.pop()
-
-
 class Url(object):
     @staticmethod
     def join(*args):
@@ -107,6 +94,18 @@ class Url(object):
 
         return re.sub(r'(?<!:)//+', '/', url)
 
+    @staticmethod
+    def paginate(url, number):
+        if number == 1:
+            return url
+
+        if url.endswith('/'):
+            return '{0}page/{1}/'.format(url, number)
+
+        root, extension = op.splitext(url)
+
+        return '{0}/page/{1}{2}'.format(root, number, extension)
+
     @staticmethod
     def slugify(string):
         slug = re.sub(r'\s+', '-', string.strip())
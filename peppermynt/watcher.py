@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+from re import search
+from sys import exc_info
+from threading import Lock, Timer as Delay
+from time import time
+import traceback
+
+from watchdog.events import FileSystemEventHandler
+
+from peppermynt.utils import get_logger
+
+
+logger = get_logger('peppermynt')
+
+
+class EventHandler(FileSystemEventHandler):
+    """Coalesces bursts of file system events into a single rebuild.
+
+    Changed paths are collected until no new event has arrived for `delay`
+    seconds, and `callback` is then called once with all of them. Rebuilds
+    never overlap; changes made during one are picked up by the next.
+    """
+    def __init__(self, src, callback, delay = 0.2):
+        self._src = src
+        self._callback = callback
+        self._delay = delay
+
+        self._lock = Lock()
+        self._building = Lock()
+        self._paths = set()
+        self._first = None
+        self._timer = None
+
+    def _queue(self, path):
+        relpath = path.replace(self._src, '')
+
+        if search(r'/[._](?!assets|containers|posts|templates)', relpath):
+            logger.debug('>> Skipping: %s', relpath)
+
+            return
+
+        with self._lock:
+            if not self._paths:
+                self._first = time()
+
+            self._paths.add(path)
+
+            if self._timer is not None:
+                self._timer.cancel()
+
+            self._timer = Delay(self._delay, self._regenerate)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _regenerate(self):
+        with self._building:
+            with self._lock:
+                paths, first = self._paths, self._first
+                self._paths, self._first = set(), None
+
+            if not paths:
+                return
+
+            logger.info('>> Change detected in: %s', ', '.join(sorted(p.replace(self._src, '') for p in paths)))
+
+            try:
+                start = time()
+
+                self._callback(paths)
+
+                logger.info('Regenerated in %.3fs, %.3fs after the first change', time() - start, time() - first)
+            except:
+                t, v, tb = exc_info()
+                lc = traceback.extract_tb(tb)[-1:][0]
+
+                logger.error('!! %s\n..  file: %s\n..  line: %s\n..    in: %s\n..    at: %s', v, *lc)
+
+                pass
+
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+
+        if event.event_type == 'moved':
+            self._queue(event.src_path)
+            self._queue(event.dest_path)
+        elif event.event_type in ('created', 'deleted', 'modified'):
+            self._queue(event.src_path)
@@ -57,7 +57,8 @@ setup(
     include_package_data = True,
     entry_points = {
         'peppermynt.parsers' : [
-            'tufte = peppermynt.parsers.tufte:Parser'
+            'tufte = peppermynt.parsers.tufte:Parser',
+            'markdown = peppermynt.parsers.markdown:Parser [markdown]'
         ],
         'peppermynt.renderers': [
             'jinja = peppermynt.renderers.jinja:Renderer'
@@ -65,13 +66,17 @@ setup(
         'console_scripts': 'peppermynt = peppermynt.main:main'
     },
     install_requires = [
-        'Jinja2>=2.7.2',
+        'Jinja2>=3.0',
         'Pygments',
         'PyYAML',
         'watchdog',
         'pypandoc',
         'doit==0.34.2'
     ],
+    extras_require = {
+        'brotli': ['Brotli'],
+        'markdown': ['Markdown>=3.6']
+    },
     classifiers = [
         'Development Status :: 4 - Beta',
         'Environment :: Console',
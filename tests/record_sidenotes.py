@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Records the output of pandoc and pandoc-sidenote for the note cases.
+
+Writes fixtures/sidenotes.json, which test_markdown_parser.py compares the
+markdown parser with. Run it again whenever the note cases, the tufte
+parser's flags or pandoc-sidenote change. It requires pandoc-sidenote to be
+installed.
+
+    $ python tests/record_sidenotes.py
+"""
+
+from os import makedirs, path as op
+import json
+import sys
+
+import pypandoc
+
+from peppermynt.parsers import tufte
+from test_markdown_parser import FIXTURES, NOTES
+
+
+def main():
+    pandoc = tufte.Parser()
+
+    if 'footnote-ref' in pandoc.parse('Text.[^1]\n\n[^1]: Note.'):
+        print('pandoc-sidenote is not installed')
+
+        return 1
+
+    makedirs(FIXTURES, exist_ok = True)
+
+    with open(op.join(FIXTURES, 'sidenotes.json'), 'w', encoding = 'utf-8') as f:
+        json.dump({
+            'pandoc': pypandoc.get_pandoc_version(),
+            'cases': {name: {'source': source, 'html': pandoc.parse(source)} for name, source in NOTES},
+        }, f, indent = 1, sort_keys = True, ensure_ascii = False)
+        f.write('\n')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
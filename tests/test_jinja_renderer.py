@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+
+from peppermynt.renderers import jinja
+
+
+class _Clock:
+    now = datetime(2020, 1, 1)
+
+    @classmethod
+    def utcnow(cls):
+        return cls.now
+
+    @staticmethod
+    def utcfromtimestamp(ts):
+        return datetime.utcfromtimestamp(ts)
+
+
+def test_now_isnt_frozen_by_bytecode_cache(tmp_path, monkeypatch):
+    templates = tmp_path / 'src' / '_templates'
+    templates.mkdir(parents = True)
+    (templates / 'feed.xml').write_text("<updated>{{ none|date('%Y-%m-%dT%H:%M:%SZ') }}</updated>")
+
+    monkeypatch.setattr(jinja, 'datetime', _Clock)
+
+    def build():
+        renderer = jinja.Renderer(str(tmp_path / 'src'), cache = str(tmp_path / 'cache'), cache_size = 1024 * 1024)
+
+        return renderer.render('feed.xml')
+
+    assert build() == '<updated>2020-01-01T00:00:00Z</updated>'
+
+    monkeypatch.setattr(_Clock, 'now', datetime(2021, 6, 1, 12, 30))
+
+    assert build() == '<updated>2021-06-01T12:30:00Z</updated>'
+    assert any((tmp_path / 'cache').glob('__jinja2_*.cache'))
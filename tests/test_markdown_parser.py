@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+"""Checks that the markdown parser marks up posts the same way as the tufte parser.
+
+The HTML is compared after normalizing whitespace, entities and attribute
+order. Cases without notes are converted by pandoc itself, and are skipped
+where it isn't installed. Cases with notes are compared with the output of
+pandoc and pandoc-sidenote that record_sidenotes.py records in
+fixtures/sidenotes.json. Without a recording, they're converted by pandoc
+and pandoc-sidenote themselves, and are skipped where pandoc-sidenote isn't
+installed.
+"""
+
+from html.parser import HTMLParser
+from os import path as op
+import json
+
+import pytest
+
+pytest.importorskip('markdown')
+
+from peppermynt.parsers import markdown, tufte
+
+
+FIXTURES = op.join(op.dirname(op.abspath(__file__)), 'fixtures')
+
+CASES = [
+    ('paragraphs', 'One *em* and **strong** and `code`.\n\nTwo, with a [link](http://example.com "title").'),
+    ('smart punctuation', 'It\'s "quoted" and \'single\' -- en --- em...'),
+    ('line break', 'Line one  \nline two'),
+    ('sections', '# One\n\nText.\n\n## Two\n\nMore.\n\n# Three\n\nLast.'),
+    ('section before text', 'Intro.\n\n# Heading\n\nBody.'),
+    ('identifiers', '# 1. Intro: "Hello", World!\n\n# Intro\n\n# Intro\n\n# 123\n\n# *Em* and `code`_x'),
+    ('explicit identifier', '# Heading {#custom .wide}\n\nText.'),
+    ('lists', '* a\n* b\n\n3. three\n4. four'),
+    ('blockquote', '> quoted\n> text'),
+    ('code', '```\nplain <code>\n```\n\n    indented & code'),
+    ('math', 'Inline $x^2 < y$ and display $$\\sum_i x_i$$ but not $5 and $6 or \\$7.'),
+    ('math in code', '`$x$` stays code.'),
+    ('figure', '![A caption](/image.png)'),
+    ('inline image', 'Text ![alt](/image.png) text.'),
+    ('autolink', 'See <http://example.com>.'),
+    ('horizontal rule', 'Above.\n\n---\n\nBelow.'),
+]
+
+NOTES = [
+    ('sidenote', 'Text.[^1] More.\n\n[^1]: A *note* with a [link](/x).'),
+    ('margin note', 'Text.[^m]\n\n[^m]: {-} A margin note.'),
+    ('numbering', 'A[^a] b[^b] c[^c].\n\n[^a]: One.\n[^b]: {-} Two.\n[^c]: Three.'),
+    ('multi-paragraph note', 'Text.[^1]\n\n[^1]: First.\n\n    Second.'),
+    ('note in heading', '# Heading[^1]\n\nText.\n\n[^1]: Note.'),
+]
+
+
+class _Tokens(HTMLParser):
+    def __init__(self):
+        super().__init__()
+
+        self.tokens = []
+
+    def handle_starttag(self, tag, attrs):
+        self.tokens.append('<{0}{1}>'.format(tag, ''.join(' {0}="{1}"'.format(k, v or '') for k, v in sorted(attrs))))
+
+    def handle_endtag(self, tag):
+        self.tokens.append('</{0}>'.format(tag))
+
+    def handle_data(self, data):
+        data = ' '.join(data.split())
+
+        if data:
+            self.tokens.append(data)
+
+
+def normalize(html):
+    tokens = _Tokens()
+    tokens.feed(html)
+    tokens.close()
+
+    return tokens.tokens
+
+
+def _recorded():
+    try:
+        with open(op.join(FIXTURES, 'sidenotes.json'), 'r', encoding = 'utf-8') as f:
+            return json.load(f)['cases']
+    except FileNotFoundError:
+        return None
+
+
+@pytest.fixture(scope = 'module')
+def pandoc():
+    pypandoc = pytest.importorskip('pypandoc')
+
+    try:
+        pypandoc.get_pandoc_version()
+    except OSError:
+        pytest.skip('pandoc is not installed')
+
+    return tufte.Parser()
+
+
+@pytest.fixture(scope = 'module')
+def sidenotes(request):
+    recorded = _recorded()
+
+    if recorded is not None:
+        def convert(name, source):
+            assert recorded[name]['source'] == source, 'the recording is out of date, run record_sidenotes.py'
+
+            return recorded[name]['html']
+
+        return convert
+
+    pandoc = request.getfixturevalue('pandoc')
+
+    # without pandoc-sidenote, pandoc leaves footnotes as they are
+    if 'footnote-ref' in pandoc.parse('Text.[^1]\n\n[^1]: Note.'):
+        pytest.skip('pandoc-sidenote is not installed and fixtures/sidenotes.json is not recorded')
+
+    return lambda name, source: pandoc.parse(source)
+
+
+@pytest.fixture(scope = 'module')
+def python():
+    return markdown.Parser()
+
+
+@pytest.mark.parametrize('name, source', CASES, ids = [name for name, _ in CASES])
+def test_matches_pandoc(pandoc, python, name, source):
+    assert normalize(python.parse(source)) == normalize(pandoc.parse(source))
+
+
+@pytest.mark.parametrize('name, source', NOTES, ids = [name for name, _ in NOTES])
+def test_matches_pandoc_sidenote(sidenotes, python, name, source):
+    assert normalize(python.parse(source)) == normalize(sidenotes(name, source))